@@ -0,0 +1,379 @@
+"""Замеры скорости горячих участков: логика игры, среды обучения, отрисовка и база данных.
+
+Запуск:
+    python benchmark.py                              - все группы, результаты на экран
+    python benchmark.py --output run.json            - то же с сохранением в JSON
+    python benchmark.py --compare base.json          - сравнить с прошлым прогоном
+    python benchmark.py --groups engine --quick      - быстрый прогон одной группы
+    python benchmark.py --groups engine --size 20x40 - логика на доске другого размера
+
+При сравнении код возврата 1 означает, что хотя бы один замер стал хуже
+порога --threshold. Отрисовка идет через платформу Qt offscreen, база
+данных создается во временном каталоге.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+
+from engine import BitBoard, Engine, ListBoard, Tetrominoe, makeRules, rulesets
+from gameloop import GameLoop
+
+
+def fillStack(board, fullLines):
+    """Заполняет нижнюю часть доски: fullLines полных линий и рваный стек над ними."""
+    rng = random.Random(0)
+    board.clear()
+
+    for y in range(fullLines):
+        for x in range(board.width):
+            board.setShapeAt(x, y, Tetrominoe.LShape)
+
+    for y in range(fullLines, fullLines + 6):
+        for x in range(board.width):
+            if rng.random() < 0.7:
+                board.setShapeAt(x, y, Tetrominoe.TShape)
+
+
+def best(run, number, repeat=5):
+    """Возвращает лучшее из repeat повторов время одного вызова run, секунды."""
+    return min(timeit.repeat(run, number=number, repeat=repeat)) / number
+
+
+def benchFits(boardClass, rules, number):
+    """Проверка столкновений фигуры во всех столбцах над стеком."""
+    board = boardClass(rules.width, rules.height)
+    fillStack(board, 0)
+
+    def run():
+        for x in range(rules.width):
+            for y in range(rules.height):
+                board.fits(Tetrominoe.TShape, 0, x, y)
+
+    return best(run, number) / (rules.width * rules.height)
+
+
+def benchTryMove(rules, number):
+    """Сдвиг фигуры влево и вправо через tryMove с подписчиком на перерисовку."""
+    engine = Engine(rules=rules)
+    engine.start(seed=0)
+    engine.onChanged = lambda bounds: None  # Как в окне: считаем прямоугольник перерисовки
+
+    def run():
+        engine.tryMove(engine.curRotation, engine.curX - 1, engine.curY)
+        engine.tryMove(engine.curRotation, engine.curX + 1, engine.curY)
+
+    return best(run, number) / 2
+
+
+def benchEngineRotation(rules, number):
+    """Поворот текущей фигуры движка туда и обратно."""
+    engine = Engine(rules=rules)
+    engine.start(seed=0)
+    engine.tryMove(engine.curRotation, engine.curX, engine.curY - 2)  # Ниже верха доски помещаются все повороты
+
+    def run():
+        engine.rotateLeft()
+        engine.rotateRight()
+
+    return best(run, number) / 2
+
+
+def benchRemoveFullLines(boardClass, rules, fullLines, number):
+    """Удаление полных линий на заранее подготовленных досках."""
+    def prepare():
+        boards = []
+        for _ in range(number):
+            board = boardClass(rules.width, rules.height)
+            fillStack(board, fullLines)
+            boards.append(board)
+        return boards
+
+    return min(timeit.timeit(lambda boards=prepare(): [board.removeFullLines() for board in boards], number=1)
+               for _ in range(3)) / number
+
+
+def benchDropDown(rules, number):
+    """Сброс фигуры с места появления на рваный стек, включая фиксацию и новую фигуру."""
+    def prepare():
+        engines = []
+        for seed in range(number):
+            engine = Engine(rules=rules)
+            engine.start(seed)
+            fillStack(engine.board, 0)
+            engines.append(engine)
+        return engines
+
+    return min(timeit.timeit(lambda engines=prepare(): [engine.dropDown() for engine in engines], number=1)
+               for _ in range(3)) / number
+
+
+def benchGame(boardClass, rules, steps):
+    """Случайная игра: такты и перемещения в секунду."""
+    rng = random.Random(0)
+    engine = Engine(boardClass, rules=rules)
+    engine.start(seed=0)
+
+    def run():
+        for _ in range(steps):
+            if not engine.isStarted:
+                engine.start()
+
+            r = rng.random()
+            if r < 0.2:
+                engine.moveLeft()
+            elif r < 0.4:
+                engine.moveRight()
+            elif r < 0.5:
+                engine.rotateLeft()
+
+            engine.step()
+
+    return steps / timeit.timeit(run, number=1)
+
+
+def engineBenchmarks(scale, rules):
+    """Замеры игровой логики без Qt по правилам rules."""
+    results = []
+    for cls in (ListBoard, BitBoard):
+        results.append((f"engine.fits[{cls.__name__}]", benchFits(cls, rules, 40 * scale) * 1e6, 'us', 'lower'))
+        for n in range(5):
+            results.append((f"engine.removeFullLines[{cls.__name__},{n}]",
+                            benchRemoveFullLines(cls, rules, n, 400 * scale) * 1e6, 'us', 'lower'))
+        results.append((f"engine.game[{cls.__name__}]", benchGame(cls, rules, 40000 * scale), 'ticks/s', 'higher'))
+
+    results.append(("engine.tryMove", benchTryMove(rules, 4000 * scale) * 1e6, 'us', 'lower'))
+    results.append(("engine.rotate", benchEngineRotation(rules, 4000 * scale) * 1e6, 'us', 'lower'))
+    results.append(("engine.dropDown", benchDropDown(rules, 400 * scale) * 1e6, 'us', 'lower'))
+    return results
+
+
+def envBenchmarks(scale, rules):
+    """Замеры сред обучения: шагов в секунду у одной партии и у пакетов партий."""
+    import numpy as np
+
+    from env import TetrisEnv, VecTetrisEnv
+
+    results = []
+    rng = np.random.default_rng(0)
+    steps = 2000 * scale
+
+    env = TetrisEnv(rules)
+    env.reset(seed=0)
+    actions = rng.integers(0, env.placements.count, steps).tolist()  # Случайные размещения
+
+    def run():
+        for action in actions:
+            if env.step(action)[2]:
+                env.reset()
+
+    results.append(("env.step[1]", steps / timeit.timeit(run, number=1), 'steps/s', 'higher'))
+
+    for count in (64, 1024):
+        env = VecTetrisEnv(count, rules)
+        env.reset(seed=0)
+        batches = rng.integers(0, env.placements.count, (max(1, steps * 8 // count), count))
+        started = time.perf_counter()
+        for batch in batches:
+            env.step(batch)
+        results.append((f"env.step[{count}]", batches.size / (time.perf_counter() - started), 'steps/s', 'higher'))
+
+    return results
+
+
+def renderBenchmarks(scale):
+    """Замеры отрисовки доски в QImage на платформе offscreen."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import QPoint
+    from PyQt6.QtGui import QImage, QRegion
+    from PyQt6.QtWidgets import QApplication, QWidget
+
+    from main import Board
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    host = QWidget()  # Доске нужен только родитель с настройками окна игры
+    host.replay = None
+    host.recordDir = None
+    host.profiler = None
+    host.max_score = 0
+    host.tickRate = GameLoop.TickRate
+    host.versus = None
+    host.rules = rulesets['classic']
+
+    board = Board(host)
+    board.resize(board.boardWidth * 24, board.boardHeight * 24)
+    board.engine.start(seed=0)
+    fillStack(board.engine.board, 0)
+    board.engine.tryMove(board.engine.curRotation, board.engine.curX, board.engine.curY - 4)
+
+    image = QImage(board.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    minX, minY, maxX, maxY = board.engine.pieceBounds(board.engine.curRotation, board.engine.curX,
+                                                      board.engine.curY)
+    pieceRegion = QRegion(board.contentsRect().left() + minX * 24,
+                          board.boardTop() + (board.boardHeight - maxY - 2) * 24,
+                          (maxX - minX + 1) * 24, (maxY - minY + 2) * 24)  # Фигура и строка над ней
+
+    def full():
+        board.render(image)
+
+    def cold():
+        board.tileSize = (0, 0)  # Плитки и слой стека строятся заново, как после изменения размера
+        board.render(image)
+
+    def piece():
+        board.render(image, QPoint(), pieceRegion)
+
+    full()  # Строим слои до замеров
+    results = [
+        ("render.full", best(full, 20 * scale) * 1e3, 'ms', 'lower'),
+        ("render.fullCold", best(cold, 5 * scale) * 1e3, 'ms', 'lower'),
+        ("render.piece", best(piece, 50 * scale) * 1e3, 'ms', 'lower'),
+    ]
+
+    board.deleteLater()
+    host.deleteLater()
+    app.processEvents()
+    return results
+
+
+def databaseBenchmarks(sizes, scale):
+    """Замеры базы данных на таблицах заданных размеров."""
+    from database import Database
+
+    results = []
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"scores-{size}.db")
+            Database(path).close()  # Создаем схему
+
+            with sqlite3.connect(path) as connection:  # Быстро заполняем таблицу напрямую
+                connection.executemany(
+                    'INSERT INTO games (score, lines, duration, played_at, player) VALUES (?, ?, ?, ?, ?)',
+                    ((rng.randrange(0, 100000, 100), 0, 60.0, '2024-01-01T00:00:00', 'bench')
+                     for _ in range(size)))
+
+            started = time.perf_counter()
+            db = Database(path)
+            db.ready.wait()  # База открывается в потоке-писателе
+            results.append((f"database.open[{size}]", (time.perf_counter() - started) * 1e3, 'ms', 'lower'))
+
+            started = time.perf_counter()
+            db.get_max_score()  # Первый вызов читает таблицу рекордов из базы
+            results.append((f"database.get_max_score.cold[{size}]", (time.perf_counter() - started) * 1e3,
+                            'ms', 'lower'))
+            results.append((f"database.get_max_score.warm[{size}]", best(db.get_max_score, 1000 * scale) * 1e6,
+                            'us', 'lower'))
+
+            started = time.perf_counter()
+            db.percentile_rank(50000)  # Первый вызов загружает все очки
+            results.append((f"database.percentile_rank.cold[{size}]", (time.perf_counter() - started) * 1e3,
+                            'ms', 'lower'))
+
+            games = 200 * scale
+            started = time.perf_counter()
+            for i in range(games):
+                db.insert_game(rng.randrange(0, 100000, 100), i, 60.0, 'bench')
+            inserted = time.perf_counter()
+            db.flush()
+            results.append((f"database.insert_game[{size}]", (inserted - started) / games * 1e6, 'us', 'lower'))
+            results.append((f"database.flush[{size}]", (time.perf_counter() - inserted) * 1e3, 'ms', 'lower'))
+
+            db.close()
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Печатает изменения относительно прошлого прогона; возвращает число ухудшений."""
+    regressions = 0
+
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or not previous['value']:
+            continue
+
+        ratio = current['value'] / previous['value']
+        worse = ratio > 1 + threshold if current['better'] == 'lower' else ratio < 1 / (1 + threshold)
+        regressions += worse
+        print(f"{'ХУЖЕ ' if worse else '     '}{name:<44}{previous['value']:>12.3f} -> "
+              f"{current['value']:>12.3f} {current['unit']:<8}{ratio:>7.2f}x")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замеры скорости логики, отрисовки и базы данных тетриса.')
+    parser.add_argument('--groups', default='engine,env,render,database',
+                        help='группы замеров через запятую: engine, env, render, database')
+    parser.add_argument('--db-sizes', default='1000,10000,100000,1000000',
+                        help='размеры таблицы партий через запятую')
+    parser.add_argument('--quick', action='store_true', help='меньше повторов и таблицы до 10^5 строк')
+    parser.add_argument('--rules', choices=sorted(rulesets), default='classic', help='правила для замеров логики и сред')
+    parser.add_argument('--size', metavar='WxH', help='размер доски для замеров логики и сред, например 20x40')
+    parser.add_argument('--output', metavar='FILE', help='сохранить результаты в JSON')
+    parser.add_argument('--compare', metavar='FILE', help='сравнить с результатами прошлого прогона')
+    parser.add_argument('--threshold', type=float, default=0.1, help='допустимое ухудшение при сравнении (доля)')
+    args = parser.parse_args()
+
+    groups = args.groups.split(',')
+    scale = 1 if args.quick else 5
+    sizes = [int(size) for size in args.db_sizes.split(',')]
+    if args.quick:
+        sizes = [size for size in sizes if size <= 100000]
+
+    try:
+        rules = makeRules(args.rules, args.size)
+    except ValueError as error:
+        parser.error(f"--size: {error}")
+
+    rows = []
+    if 'engine' in groups:
+        rows += engineBenchmarks(scale, rules)
+    if 'env' in groups:
+        rows += envBenchmarks(scale, rules)
+    if 'render' in groups:
+        rows += renderBenchmarks(scale)
+    if 'database' in groups:
+        rows += databaseBenchmarks(sizes, scale)
+
+    results = {}
+    for name, value, unit, better in rows:
+        results[name] = {'value': value, 'unit': unit, 'better': better}
+        print(f"{name:<44}{value:>14.3f} {unit}")
+
+    if args.output:
+        report = {
+            'meta': {
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'quick': args.quick,
+                'rules': f"{rules.name} {rules.width}x{rules.height}",
+            },
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+
+        print()
+        regressions = compare(results, baseline, args.threshold)
+        print(f"Ухудшений: {regressions}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
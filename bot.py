@@ -0,0 +1,190 @@
+import numpy as np
+
+from engine import Action, PieceTable, Tetrominoe
+
+
+def distinctRotations(shape):
+    """Возвращает индексы поворотов фигуры с различающимися координатами."""
+    seen = set()
+    rotations = []
+
+    for rotation, coords in enumerate(PieceTable.coords[shape]):
+        if coords not in seen:
+            seen.add(coords)
+            rotations.append(rotation)
+
+    return tuple(rotations)
+
+
+class Bot:
+    """Автоигрок: перебирает все (поворот, столбец) и выбирает лучшую позицию.
+
+    Достижимость позиций проверяется на движке (как при нажатии клавиш),
+    а место падения и оценка всех получившихся досок считаются пакетом в
+    NumPy: доски складываются в массив (кандидаты, высота, ширина).
+    Оценка - взвешенная сумма суммарной высоты, удаленных линий, дыр и
+    неровности поверхности.
+    """
+
+    Weights = (-0.510066, 0.760666, -0.35663, -0.184483)  # Высота, линии, дыры, неровность
+
+    rotationsTable = tuple(distinctRotations(shape) for shape in range(len(PieceTable.coords)))
+    offsetsTable = tuple(tuple((np.array([x for x, _ in coords]), np.array([y for _, y in coords]))
+                               for coords in rotations) for rotations in PieceTable.coords)
+
+    def __init__(self, weights=Weights):
+        self.weights = np.array(weights, dtype=float)  # Веса признаков доски
+
+    def boardGrid(self, engine):
+        """Возвращает занятость доски массивом (высота, ширина) из bool."""
+        bits = np.array(engine.board.rowBits(), dtype=np.int64)
+        return ((bits[:, None] >> np.arange(engine.board.width)) & 1).astype(bool)
+
+    def searchRow(self, engine):
+        """Возвращает строку, с которой ищутся позиции.
+
+        Фигура появляется вплотную к верху доски, где большинство поворотов
+        не помещается, поэтому перед поиском она опускается на две строки.
+        """
+        y = engine.curY
+        while y > engine.board.height - 3 and engine.board.fits(engine.curShape, engine.curRotation,
+                                                                engine.curX, y - 1):
+            y -= 1
+        return y
+
+    def reachable(self, engine, curY):
+        """Перечисляет позиции, достижимые в строке curY: [(поворот, minX, maxX)]."""
+        fits = engine.board.fits
+        shape = engine.curShape
+        curX = engine.curX
+        left = (engine.curRotation + 1) & 3
+        right = (engine.curRotation - 1) & 3
+
+        # Повороты, до которых можно дойти нажатиями влево или вправо на месте появления
+        rotations = {engine.curRotation}
+        if fits(shape, left, curX, curY):
+            rotations.add(left)
+            if fits(shape, (left + 1) & 3, curX, curY):
+                rotations.add((left + 1) & 3)
+        if fits(shape, right, curX, curY):
+            rotations.add(right)
+            if fits(shape, (right - 1) & 3, curX, curY):
+                rotations.add((right - 1) & 3)
+
+        result = []
+        for rotation in Bot.rotationsTable[shape]:
+            if rotation not in rotations:
+                continue
+
+            minX = curX
+            while fits(shape, rotation, minX - 1, curY):  # Насколько можно сдвинуть влево
+                minX -= 1
+
+            maxX = curX
+            while fits(shape, rotation, maxX + 1, curY):  # Насколько можно сдвинуть вправо
+                maxX += 1
+
+            result.append((rotation, minX, maxX))
+
+        return result
+
+    def evaluate(self, boards):
+        """Оценивает пакет досок (кандидаты, высота, ширина); возвращает массив оценок."""
+        count, height, width = boards.shape
+
+        full = boards.all(axis=2)  # Полные строки (кандидаты, высота)
+        lines = full.sum(axis=1)
+        filled = boards & ~full[:, :, None]  # Клетки, которые останутся после удаления линий
+
+        # Высота столбца после удаления линий: верхняя клетка минус полные строки под ней
+        top = (filled * np.arange(1, height + 1)[None, :, None]).max(axis=1)
+        fullBelow = np.concatenate([np.zeros((count, 1), dtype=int), np.cumsum(full, axis=1)], axis=1)
+        heights = top - np.take_along_axis(fullBelow, top, axis=1)
+
+        holes = (heights - filled.sum(axis=1)).sum(axis=1)  # Пустые клетки под верхом столбца
+        bumpiness = np.abs(np.diff(heights, axis=1)).sum(axis=1)
+
+        features = np.stack([heights.sum(axis=1), lines, holes, bumpiness], axis=1)
+        return features @ self.weights
+
+    def choose(self, engine):
+        """Выбирает лучшую позицию для текущей фигуры: (поворот, x) или None."""
+        if engine.curShape == Tetrominoe.NoShape:
+            return None
+
+        shape = engine.curShape
+        grid = self.boardGrid(engine)
+        height = engine.board.height
+        curY = self.searchRow(engine)
+
+        # Кандидаты: столбцы клеток и смещения по y для каждой пары (поворот, x)
+        rotations = []
+        xs = []
+        columns = []
+        offsets = []
+        for rotation, minX, maxX in self.reachable(engine, curY):
+            dx, dy = Bot.offsetsTable[shape][rotation]
+            candidateX = np.arange(minX, maxX + 1)
+            rotations.append(np.full(len(candidateX), rotation))
+            xs.append(candidateX)
+            columns.append(candidateX[:, None] + dx[None, :])
+            offsets.append(np.broadcast_to(dy, (len(candidateX), 4)))
+
+        rotations = np.concatenate(rotations)
+        xs = np.concatenate(xs)
+        columns = np.concatenate(columns)
+        offsets = np.concatenate(offsets)
+
+        # Падение сверху: фигура встает на самую высокую занятую клетку под собой
+        top = np.array(engine.board.heights)
+        landY = (top[columns] + offsets).max(axis=1)
+
+        # Над нависающим стеком прямое падение не работает: досчитываем такие позиции на движке
+        for k in np.flatnonzero(landY > curY):
+            y = curY
+            while y > 0 and engine.board.fits(shape, rotations[k], xs[k], y - 1):
+                y -= 1
+            landY[k] = y
+
+        rows = landY[:, None] - offsets
+        count = len(xs)
+        boards = np.repeat(grid[None], count, axis=0)
+        boards[np.arange(count)[:, None], np.minimum(rows, height - 1), columns] = True
+
+        scores = self.evaluate(boards)
+        scores[(rows >= height).any(axis=1)] = -np.inf  # Фигура не помещается на доску
+
+        best = int(np.argmax(scores))
+        return int(rotations[best]), int(xs[best])
+
+    def play(self, engine):
+        """Ставит текущую фигуру в выбранную позицию и роняет ее.
+
+        Фигура ведется теми же действиями, что и клавиши игрока, поэтому ход
+        бота записывается в повтор как обычный ввод.
+        """
+        move = self.choose(engine)
+        if move is None:
+            return False
+
+        rotation, x = move
+        for _ in range(engine.curY - self.searchRow(engine)):  # Опускаем фигуру для поворотов
+            engine.apply(Action.OneLineDown)
+
+        if rotation == (engine.curRotation - 1) & 3:  # Один поворот вправо короче трех влево
+            engine.apply(Action.RotateRight)
+        elif rotation == (engine.curRotation - 2) & 3 and not engine.board.fits(
+                engine.curShape, (engine.curRotation + 1) & 3, engine.curX, engine.curY):
+            engine.apply(Action.RotateRight)  # Поворот на 180 градусов возможен только через правую сторону
+            engine.apply(Action.RotateRight)
+        else:
+            while engine.curRotation != rotation and engine.apply(Action.RotateLeft):
+                pass
+
+        while engine.curX > x and engine.apply(Action.MoveLeft):
+            pass
+        while engine.curX < x and engine.apply(Action.MoveRight):
+            pass
+
+        engine.apply(Action.DropDown)
+        return True
@@ -0,0 +1,250 @@
+"""Панель турнира: десятки живых или записанных партий в одном окне.
+
+Каждой партией управляет движок без Qt (бот или повтор), а окно рисует
+все доски за один проход: зафиксированные клетки всех досок лежат на
+одном общем холсте и перерисовываются только в строках, которые
+изменились, а падающие фигуры всех досок выводятся одним вызовом
+drawPixmapFragments из общего атласа плиток.
+
+Запуск: python dashboard.py --bots 32 --speed 2 [--size 20x40] [повтор.trp ...]
+"""
+import argparse
+import math
+import sys
+import time
+
+from PyQt6.QtCore import QPointF, QRectF, Qt, QTimer
+from PyQt6.QtGui import QColor, QFont, QPainter, QPixmap
+from PyQt6.QtWidgets import QApplication, QWidget
+
+from bot import Bot
+from engine import Engine, Tetrominoe, makeRules, rulesets
+from generator import generators
+from main import Board
+from replay import Replay
+
+
+class TileAtlas:
+    """Плитки всех форм заданного размера в одной картинке."""
+
+    def __init__(self, width, height):
+        self.width = width  # Ширина плитки
+        self.height = height  # Высота плитки
+        self.pixmap = QPixmap(width * len(Board.colorTable), height)  # Плитки по порядку форм
+        self.pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(self.pixmap)
+        for shape in range(1, len(Board.colorTable)):
+            painter.drawPixmap(shape * width, 0, Board.renderTile(shape, width, height))
+        painter.end()
+
+        self.sources = [QRectF(shape * width, 0, width, height) for shape in range(len(Board.colorTable))]
+
+    def fragment(self, shape, left, top):
+        """Возвращает фрагмент плитки формы с левым верхним углом (left, top)."""
+        return QPainter.PixmapFragment.create(QPointF(left + self.width / 2, top + self.height / 2),
+                                              self.sources[shape])
+
+
+class BotGame:
+    """Живая партия бота; после проигрыша начинается следующая с новым зерном."""
+
+    def __init__(self, name, generator, seed, rules):
+        self.name = name  # Подпись доски
+        self.engine = Engine(generator=generators[generator](), rules=rules)
+        self.bot = Bot()
+        self.seed = seed  # Зерно текущей партии
+        self.games = 0  # Сыграно партий
+        self.best = 0  # Лучший счет
+        self.engine.start(seed)
+
+    def advance(self):
+        """Один ход: бот ставит фигуру или появляется новая."""
+        engine = self.engine
+        if not engine.isStarted:  # Партия окончена: записываем результат и начинаем новую
+            self.games += 1
+            self.best = max(self.best, engine.current_score)
+            self.seed += 1
+            engine.start(self.seed)
+        elif engine.curShape != Tetrominoe.NoShape:
+            self.bot.play(engine)
+        else:
+            engine.step()
+
+    def label(self):
+        """Возвращает подпись доски."""
+        return f"{self.name}: {self.engine.current_score} / {self.best}"
+
+
+class ReplayGame:
+    """Воспроизведение записанной партии."""
+
+    def __init__(self, name, replay):
+        self.name = name  # Подпись доски
+        self.replay = replay
+        self.engine = replay.newEngine()
+        self.position = 0  # Индекс следующего события
+        self.engine.start(replay.seed)
+
+    def advance(self):
+        """Один шаг гравитации вместе с записанными до него действиями."""
+        engine = self.engine
+        events = self.replay.events
+
+        while self.position < len(events) and events[self.position][0] <= engine.ticks:
+            engine.apply(events[self.position][1])
+            self.position += 1
+
+        if engine.isStarted and (self.position < len(events) or engine.ticks < self.replay.ticks):
+            engine.step()
+
+    def label(self):
+        """Возвращает подпись доски."""
+        return f"{self.name}: {self.engine.current_score}"
+
+
+class Dashboard(QWidget):
+    """Сетка досок, которые рисуются одним проходом из общего холста и атласа."""
+
+    Background = 0x202020  # Цвет пустой доски
+    LabelHeight = 14  # Высота подписи над доской
+    Spacing = 8  # Промежуток между досками
+
+    def __init__(self, games, cell=8, columns=None, fps=60, speed=1):
+        super().__init__()
+        self.games = games  # Партии на досках
+        self.cell = cell  # Размер клетки в пикселях
+        self.speed = speed  # Ходов каждой партии за кадр
+        self.atlas = TileAtlas(cell, cell)
+
+        columns = columns or max(1, min(len(games), round(math.sqrt(len(games) * 2.2))))
+        rows = math.ceil(len(games) / columns)
+        width = max(game.engine.board.width for game in games)  # Место в сетке - под самую большую доску
+        height = max(game.engine.board.height for game in games)
+        stepX = width * cell + Dashboard.Spacing
+        stepY = height * cell + Dashboard.LabelHeight + Dashboard.Spacing
+
+        self.origins = [(Dashboard.Spacing + (i % columns) * stepX,
+                         Dashboard.Spacing + Dashboard.LabelHeight + (i // columns) * stepY)
+                        for i in range(len(games))]  # Левый верхний угол каждой доски
+        self.setFixedSize(Dashboard.Spacing + columns * stepX, Dashboard.Spacing + rows * stepY)
+
+        self.canvas = QPixmap(self.size())  # Зафиксированные клетки всех досок
+        self.canvas.fill(QColor(0x404040))
+        for index, game in enumerate(games):
+            game.engine.onStackChanged = lambda bounds, index=index: self.renderStack(index, bounds[1], bounds[3])
+            self.renderStack(index, 0, game.engine.board.height - 1)
+
+        self.frames = 0  # Кадров с последнего замера
+        self.frameTime = 0.0  # Время отрисовки с последнего замера
+        self.measuredAt = time.perf_counter()
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.frame)
+        self.timer.start(max(1, 1000 // fps))
+
+    def frame(self):
+        """Продвигает все партии и запрашивает одну перерисовку окна."""
+        for game in self.games:
+            for _ in range(self.speed):
+                game.advance()
+        self.update()
+
+    def renderStack(self, index, minY, maxY):
+        """Перерисовывает на холсте строки доски index с minY по maxY."""
+        left, top = self.origins[index]
+        cell = self.cell
+        engine = self.games[index].engine
+        width = engine.board.width
+        height = engine.board.height
+        atlas = self.atlas
+
+        painter = QPainter(self.canvas)
+        painter.fillRect(left, top + (height - maxY - 1) * cell,
+                         width * cell, (maxY - minY + 1) * cell, QColor(Dashboard.Background))
+
+        for y in range(minY, maxY + 1):
+            rowTop = top + (height - y - 1) * cell
+            for x in range(width):
+                shape = engine.shapeAt(x, y)
+                if shape != Tetrominoe.NoShape:
+                    painter.drawPixmap(QRectF(left + x * cell, rowTop, cell, cell), atlas.pixmap, atlas.sources[shape])
+
+        painter.end()
+
+    def paintEvent(self, event):
+        """Рисует все доски: холст, затем падающие фигуры одним вызовом и подписи."""
+        started = time.perf_counter()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.canvas)
+
+        cell = self.cell
+        fragments = []
+        for (left, top), game in zip(self.origins, self.games):
+            engine = game.engine
+            if engine.curShape != Tetrominoe.NoShape:
+                bottom = top + (engine.board.height - 1) * cell  # Верх нижней строки доски
+                for x, y in engine.pieceCells():
+                    fragments.append(self.atlas.fragment(engine.curShape, left + x * cell, bottom - y * cell))
+        painter.drawPixmapFragments(fragments, self.atlas.pixmap)
+
+        painter.setPen(QColor(0xFFFFFF))
+        painter.setFont(QFont('Arial', 8))
+        for (left, top), game in zip(self.origins, self.games):
+            painter.drawText(left, top - 3, game.label())
+
+        painter.end()
+        self.measure(time.perf_counter() - started)
+
+    def measure(self, elapsed):
+        """Раз в секунду показывает частоту кадров и время отрисовки в заголовке окна."""
+        self.frames += 1
+        self.frameTime += elapsed
+        now = time.perf_counter()
+
+        if now - self.measuredAt >= 1.0:
+            self.setWindowTitle(f"Турнир: {len(self.games)} досок, {self.frames / (now - self.measuredAt):.0f} кадр/с, "
+                                f"отрисовка {1000 * self.frameTime / self.frames:.2f} мс")
+            self.frames = 0
+            self.frameTime = 0.0
+            self.measuredAt = now
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Панель турнира: много партий ботов и повторов в одном окне.')
+    parser.add_argument('replays', nargs='*', help='файлы повторов для показа')
+    parser.add_argument('--bots', type=int, default=16, help='сколько досок занять партиями бота')
+    parser.add_argument('--generator', choices=sorted(generators), default='bag', help='порядок фигур для ботов')
+    parser.add_argument('--rules', choices=sorted(rulesets), default='classic', help='правила партий ботов')
+    parser.add_argument('--size', metavar='WxH', help='размер доски ботов, например 20x40')
+    parser.add_argument('--seed', type=int, default=0, help='зерно первой партии; доска i начинает с seed + 1000 * i')
+    parser.add_argument('--cell', type=int, default=8, help='размер клетки в пикселях')
+    parser.add_argument('--columns', type=int, help='досок в ряду (по умолчанию - по размеру сетки)')
+    parser.add_argument('--fps', type=int, default=60, help='кадров в секунду')
+    parser.add_argument('--speed', type=int, default=1, help='ходов каждой партии за кадр')
+    args, qtArgs = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qtArgs)
+
+    games = []
+    for path in args.replays:
+        try:
+            games.append(ReplayGame(path, Replay.load(path)))
+        except (OSError, ValueError) as error:
+            parser.error(f"повтор {path}: {error}")
+    try:
+        rules = makeRules(args.rules, args.size)
+    except ValueError as error:
+        parser.error(f"--size: {error}")
+    games += [BotGame(f"бот {i + 1}", args.generator, args.seed + 1000 * i, rules) for i in range(args.bots)]
+    if not games:
+        parser.error("нечего показывать: укажите повторы или --bots")
+
+    dashboard = Dashboard(games, args.cell, args.columns, args.fps, args.speed)
+    dashboard.show()
+    sys.exit(app.exec())
+
+
+if __name__ == '__main__':
+    main()
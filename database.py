@@ -0,0 +1,229 @@
+import bisect
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+class Database:
+    """Хранилище результатов партий с записью в фоновом потоке.
+
+    Каждая партия - одна строка таблицы games: (score, lines, duration,
+    played_at, player). insert_game только ставит партию в очередь; поток-
+    писатель собирает очередь в пакеты и фиксирует их раз в CommitInterval
+    секунд, по запросу flush или при закрытии, так что игровой поток не
+    ждет диска. Файл открывается и переносится на новую схему тоже в
+    потоке-писателе: конструктор не ждет SQLite, а первое чтение ждет,
+    пока база будет готова (request_max_score не ждет совсем). Таблица рекордов и распределение очков
+    кэшируются в памяти и обновляются при вставке, не дожидаясь записи на
+    диск.
+    """
+
+    SchemaVersion = 1  # Версия схемы в PRAGMA user_version
+    CommitInterval = 1.0  # Максимальная задержка записи пакета, секунды
+    BatchSize = 500  # Максимальный размер пакета
+    LeaderboardSize = 100  # Сколько лучших партий держать в памяти
+
+    def __init__(self, path='tetris_scores.db', timings=None):
+        self.path = path  # Путь к файлу базы данных
+        self.timings = timings or {}  # Участок ('open', 'commit', 'max') -> функция(секунды) из потока-писателя
+        self.connection = None  # Соединение для чтения из игрового потока (открывается лениво)
+        self.ready = threading.Event()  # Поток-писатель открыл базу и перенес данные
+        self.error = None  # Ошибка открытия базы в потоке-писателе
+        self.write_error = None  # Последняя ошибка записи пакета (пакет остается в очереди на повтор)
+
+        self.leaderboard = None  # Лучшие партии по убыванию очков (загружаются лениво)
+        self.sorted_scores = None  # Очки всех партий по возрастанию (загружаются лениво)
+
+        self.queue = queue.Queue()  # Очередь команд для потока-писателя
+        self.writer = threading.Thread(target=self.write_loop, name='score-writer', daemon=True)
+        self.writer.start()  # Запускаем поток-писатель
+
+    def create_table(self, connection):
+        """Создает таблицу партий и переносит очки из старой таблицы scores."""
+        version = connection.execute('PRAGMA user_version').fetchone()[0]
+        if version >= Database.SchemaVersion:
+            return
+
+        with connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS games (
+                    id INTEGER PRIMARY KEY,
+                    score INTEGER NOT NULL,
+                    lines INTEGER NOT NULL DEFAULT 0,
+                    duration REAL,
+                    played_at TEXT,
+                    player TEXT NOT NULL DEFAULT ''
+                )
+            ''')
+            connection.execute('CREATE INDEX IF NOT EXISTS games_score ON games (score)')
+
+            legacy = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scores'").fetchone()
+            if legacy:
+                rows = connection.execute('SELECT score FROM scores ORDER BY id')
+                connection.executemany('INSERT INTO games (score, lines) VALUES (?, ?)',
+                                       [(score, score // 100) for score in Database.collapse_scores(rows)])
+                connection.execute('DROP TABLE scores')
+
+            connection.execute(f'PRAGMA user_version = {Database.SchemaVersion}')
+
+    @staticmethod
+    def collapse_scores(rows):
+        """Сводит промежуточные очки старой таблицы к итоговому счету каждой партии.
+
+        Раньше счет записывался после каждого удаления линий, поэтому внутри
+        партии он только растет; падение или повтор означают новую партию.
+        """
+        games = []
+        previous = None
+
+        for (score,) in rows:
+            if previous is not None and score > previous:
+                games[-1] = score  # Та же партия: запоминаем последний счет
+            else:
+                games.append(score)  # Началась новая партия
+            previous = score
+
+        return games
+
+    def insert_game(self, score, lines, duration, player=''):
+        """Ставит результат партии в очередь на запись и обновляет кэши."""
+        row = (score, lines, duration, datetime.now().isoformat(timespec='seconds'), player)
+        self.queue.put(('game', row))
+
+        if self.leaderboard is not None:
+            self.leaderboard.append(row)
+            self.leaderboard.sort(key=lambda game: -game[0])  # Сортировка устойчива: ранние партии выше
+            del self.leaderboard[Database.LeaderboardSize:]
+
+        if self.sorted_scores is not None:
+            bisect.insort(self.sorted_scores, score)
+
+    def request_max_score(self, callback):
+        """Просит поток-писатель прочитать максимальный счет и передать его в callback (из потока-писателя)."""
+        self.queue.put(('max', callback))
+
+    def flush(self, wait=True):
+        """Фиксирует накопленные партии; при wait=True ждет окончания записи."""
+        done = threading.Event()
+        self.queue.put(('flush', done))
+
+        if wait:
+            self.ready.wait()
+            if self.error is not None:  # Поток-писатель не открыл базу и ничего не запишет
+                raise self.error
+            done.wait()
+
+    def report(self, name, started):
+        """Передает длительность участка name, начатого в started, функции из timings."""
+        if name in self.timings:
+            self.timings[name](time.perf_counter() - started)
+
+    def write_loop(self):
+        """Открывает базу и записывает партии из очереди пакетами (выполняется в потоке-писателе)."""
+        try:
+            started = time.perf_counter()
+            connection = sqlite3.connect(self.path)  # У потока свое соединение
+            connection.execute('PRAGMA journal_mode=WAL')  # Чтение не блокирует запись
+            connection.execute('PRAGMA synchronous=NORMAL')  # В режиме WAL достаточно для сохранности
+            self.create_table(connection)  # Создаем таблицу и переносим старые данные
+            self.report('open', started)
+        except sqlite3.Error as error:
+            self.error = error
+            raise
+        finally:
+            self.ready.set()
+
+        pending = []  # Партии, ожидающие записи
+
+        while True:
+            try:
+                command, value = self.queue.get(timeout=Database.CommitInterval if pending else None)
+            except queue.Empty:
+                command, value = 'flush', None  # Истек интервал: записываем накопленное
+
+            if command == 'game':
+                pending.append(value)
+                if len(pending) < Database.BatchSize:
+                    continue
+
+            if pending:
+                started = time.perf_counter()
+                try:
+                    with connection:
+                        connection.executemany(
+                            'INSERT INTO games (score, lines, duration, played_at, player) VALUES (?, ?, ?, ?, ?)',
+                            pending)
+                except sqlite3.Error as error:  # Например, база занята другим процессом: повторим через интервал
+                    self.write_error = error
+                else:
+                    pending = []
+                    self.write_error = None
+                    self.report('commit', started)
+
+            if command == 'max':  # Партии из очереди уже записаны выше
+                try:
+                    started = time.perf_counter()
+                    score = connection.execute('SELECT MAX(score) FROM games').fetchone()[0] or 0
+                    self.report('max', started)
+                    value(score)
+                except sqlite3.Error as error:
+                    self.write_error = error
+            elif command == 'flush' and value is not None:
+                value.set()  # Сообщаем ожидающему, что запись завершена (или не удалась - см. write_error)
+            elif command == 'close':
+                break
+
+        connection.close()
+
+    def reader(self):
+        """Возвращает соединение для чтения, дождавшись, пока поток-писатель откроет базу."""
+        if self.connection is None:
+            self.ready.wait()
+            if self.error is not None:
+                raise self.error
+            self.connection = sqlite3.connect(self.path)
+
+        return self.connection
+
+    def top_scores(self, n=10):
+        """Возвращает n лучших партий: (score, lines, duration, played_at, player)."""
+        if n > Database.LeaderboardSize:  # Больше, чем держим в памяти: читаем из базы
+            self.flush()
+            return self.reader().execute(
+                'SELECT score, lines, duration, played_at, player FROM games '
+                'ORDER BY score DESC, id LIMIT ?', (n,)).fetchall()
+
+        if self.leaderboard is None:
+            self.flush()  # Партии из очереди должны попасть в выборку
+            self.leaderboard = self.reader().execute(
+                'SELECT score, lines, duration, played_at, player FROM games '
+                'ORDER BY score DESC, id LIMIT ?', (Database.LeaderboardSize,)).fetchall()
+
+        return self.leaderboard[:n]
+
+    def percentile_rank(self, score):
+        """Возвращает процент партий, в которых набрано меньше очков, чем score."""
+        if self.sorted_scores is None:
+            self.flush()  # Партии из очереди должны попасть в выборку
+            self.sorted_scores = [row[0] for row in self.reader().execute('SELECT score FROM games ORDER BY score')]
+
+        if not self.sorted_scores:
+            return 0.0  # Сравнивать не с чем
+
+        return 100.0 * bisect.bisect_left(self.sorted_scores, score) / len(self.sorted_scores)
+
+    def get_max_score(self):
+        """Извлекает максимальный счет из базы данных."""
+        top = self.top_scores(1)
+        return top[0][0] if top else 0
+
+    def close(self):
+        """Дописывает очередь и закрывает соединения с базой данных."""
+        self.queue.put(('close', None))
+        self.writer.join()  # Ждем, пока поток-писатель запишет все партии
+
+        if self.connection is not None:
+            self.connection.close()
@@ -0,0 +1,645 @@
+from generator import RandomGenerator
+
+
+class Tetrominoe:
+    NoShape = 0
+    ZShape = 1
+    SShape = 2
+    LineShape = 3
+    TShape = 4
+    SquareShape = 5
+    LShape = 6
+    MirroredLShape = 7
+    Garbage = 8  # Клетка мусорной линии (только на доске, не фигура)
+
+
+coordsTable = (
+    ((0, 0), (0, 0), (0, 0), (0, 0)),
+    ((0, -1), (0, 0), (-1, 0), (-1, 1)),
+    ((0, -1), (0, 0), (1, 0), (1, 1)),
+    ((0, -1), (0, 0), (0, 1), (0, 2)),
+    ((-1, 0), (0, 0), (1, 0), (0, 1)),
+    ((0, 0), (1, 0), (0, 1), (1, 1)),
+    ((-1, -1), (0, -1), (0, 0), (0, 1)),
+    ((1, -1), (0, -1), (0, 0), (0, 1))
+)
+
+
+def buildRotations(shape):
+    """Строит четыре поворота фигуры; поворот с индексом i+1 - это поворот i влево."""
+    coords = coordsTable[shape]
+    rotations = [coords]
+
+    for _ in range(3):
+        if shape != Tetrominoe.SquareShape:  # Квадрат не поворачивается
+            coords = tuple((y, -x) for x, y in coords)
+        rotations.append(coords)
+
+    return tuple(rotations)
+
+
+def buildExtents(coords):
+    """Возвращает (minX, maxX, minY, maxY) для координат фигуры."""
+    xs = [x for x, _ in coords]
+    ys = [y for _, y in coords]
+    return min(xs), max(xs), min(ys), max(ys)
+
+
+def buildRowMasks(coords):
+    """Возвращает пары (y, маска) с битами клеток строки относительно minX."""
+    minX = min(x for x, _ in coords)
+    masks = {}
+
+    for x, y in coords:
+        masks[y] = masks.get(y, 0) | (1 << (x - minX))
+
+    return tuple(sorted(masks.items()))
+
+
+class PieceTable:
+    """Повороты фигур, предвычисленные при импорте.
+
+    Фигура задается парой (форма, индекс поворота); все таблицы
+    индексируются как table[shape][rotation] и не меняются во время игры.
+    """
+
+    coords = tuple(buildRotations(shape) for shape in range(len(coordsTable)))  # Координаты клеток
+    extents = tuple(tuple(buildExtents(c) for c in rotations) for rotations in coords)  # Габариты
+    rowMasks = tuple(tuple(buildRowMasks(c) for c in rotations) for rotations in coords)  # Маски строк
+
+
+class ListBoard:
+    """Доска в виде плоского списка ячеек (исходное представление)."""
+
+    def __init__(self, width, height):
+        self.width = width  # Ширина доски
+        self.height = height  # Высота доски
+        self.cells = []  # Ячейки доски построчно снизу вверх
+        self.heights = []  # Высота каждого столбца: строка над его верхней занятой ячейкой
+        self.clear()
+
+    def clear(self):
+        """Очищает доску."""
+        self.cells = [Tetrominoe.NoShape] * (self.height * self.width)
+        self.heights = [0] * self.width
+
+    def shapeAt(self, x, y):
+        """Определяет форму на позиции доски."""
+        return self.cells[(y * self.width) + x]
+
+    def setShapeAt(self, x, y, shape):
+        """Устанавливает форму на доске."""
+        self.cells[(y * self.width) + x] = shape
+
+        if shape != Tetrominoe.NoShape:
+            self.heights[x] = max(self.heights[x], y + 1)
+        elif y + 1 == self.heights[x]:  # Освободилась верхняя ячейка столбца
+            self.heights[x] = self.columnHeight(x)
+
+    def columnHeight(self, x):
+        """Считает высоту столбца x по ячейкам."""
+        for y in range(self.height - 1, -1, -1):
+            if self.cells[y * self.width + x] != Tetrominoe.NoShape:
+                return y + 1
+        return 0
+
+    def rowBits(self):
+        """Возвращает маски занятости строк снизу вверх (бит x - ячейка x)."""
+        width = self.width
+        cells = self.cells
+        return [sum(1 << x for x in range(width) if cells[y * width + x] != Tetrominoe.NoShape)
+                for y in range(self.height)]
+
+    def fits(self, shape, rotation, newX, newY):
+        """Проверяет, помещается ли фигура в заданную позицию."""
+        for dx, dy in PieceTable.coords[shape][rotation]:
+            x = newX + dx
+            y = newY - dy
+
+            if x < 0 or x >= self.width or y < 0 or y >= self.height:  # Проверяем границы
+                return False
+
+            if self.shapeAt(x, y) != Tetrominoe.NoShape:  # Проверяем на занятые ячейки
+                return False
+
+        return True
+
+    def place(self, shape, rotation, newX, newY):
+        """Устанавливает фигуру на доску."""
+        for dx, dy in PieceTable.coords[shape][rotation]:
+            self.setShapeAt(newX + dx, newY - dy, shape)
+
+    def removeFullLines(self):
+        """Удаляет полные линии и возвращает их количество."""
+        rowsToRemove = []  # Список полных линий
+
+        for i in range(self.height):
+            n = 0
+            for j in range(self.width):
+                if not self.shapeAt(j, i) == Tetrominoe.NoShape:  # Если ячейка не пустая
+                    n += 1
+
+            if n == self.width:  # Если линия полная
+                rowsToRemove.append(i)  # Добавляем в список полных линий
+
+        rowsToRemove.reverse()  # Переворачиваем список для удаления
+
+        for m in rowsToRemove:
+            for k in range(m, self.height - 1):
+                for l in range(self.width):
+                    self.setShapeAt(l, k, self.shapeAt(l, k + 1))  # Сдвигаем линии вниз
+
+            for l in range(self.width):
+                self.setShapeAt(l, self.height - 1, Tetrominoe.NoShape)  # Верхняя линия пустеет
+
+        if rowsToRemove:
+            self.heights = [self.columnHeight(x) for x in range(self.width)]
+
+        return len(rowsToRemove)
+
+    def insertGarbage(self, count, hole):
+        """Поднимает стек на count мусорных линий с пустой ячейкой hole; возвращает True, если стек вылез за верх."""
+        width = self.width
+        overflow = any(cell != Tetrominoe.NoShape for cell in self.cells[(self.height - count) * width:])
+
+        row = [Tetrominoe.Garbage] * width
+        row[hole] = Tetrominoe.NoShape
+        self.cells = row * count + self.cells[:(self.height - count) * width]
+        self.heights = [self.columnHeight(x) for x in range(width)]
+
+        return overflow
+
+
+class BitBoard:
+    """Доска, где каждая строка хранится битовой маской.
+
+    Бит x в rows[y] установлен, если ячейка (x, y) занята, а цвет ячейки
+    лежит отдельно в colors[y][x]. Проверка полной линии сводится к одному
+    сравнению, столкновение - к побитовому И, а удаление линий - к срезу
+    списков строк.
+    """
+
+    def __init__(self, width, height):
+        self.width = width  # Ширина доски
+        self.height = height  # Высота доски
+        self.fullRow = (1 << width) - 1  # Маска полностью заполненной строки
+        self.rows = []  # Маски занятости строк снизу вверх
+        self.colors = []  # Формы ячеек по строкам
+        self.heights = []  # Высота каждого столбца: строка над его верхней занятой ячейкой
+        self.clear()
+
+    def clear(self):
+        """Очищает доску."""
+        self.rows = [0] * self.height
+        self.colors = [bytearray(self.width) for _ in range(self.height)]
+        self.heights = [0] * self.width
+
+    def shapeAt(self, x, y):
+        """Определяет форму на позиции доски."""
+        return self.colors[y][x]
+
+    def setShapeAt(self, x, y, shape):
+        """Устанавливает форму на доске."""
+        self.colors[y][x] = shape
+
+        if shape == Tetrominoe.NoShape:
+            self.rows[y] &= ~(1 << x)
+            if y + 1 == self.heights[x]:  # Освободилась верхняя ячейка столбца
+                self.heights = self.columnHeights()
+        else:
+            self.rows[y] |= 1 << x
+            self.heights[x] = max(self.heights[x], y + 1)
+
+    def columnHeights(self):
+        """Считает высоты всех столбцов, просматривая строки сверху до первой занятой ячейки каждого."""
+        heights = [0] * self.width
+        remaining = self.fullRow  # Столбцы, верх которых еще не найден
+        rows = self.rows
+
+        for y in range(self.height - 1, -1, -1):
+            found = rows[y] & remaining
+            while found:
+                bit = found & -found
+                heights[bit.bit_length() - 1] = y + 1
+                found ^= bit
+
+            remaining &= ~rows[y]
+            if not remaining:
+                break
+
+        return heights
+
+    def rowBits(self):
+        """Возвращает маски занятости строк снизу вверх (бит x - ячейка x)."""
+        return list(self.rows)
+
+    def fits(self, shape, rotation, newX, newY):
+        """Проверяет, помещается ли фигура в заданную позицию."""
+        minX, maxX, minY, maxY = PieceTable.extents[shape][rotation]
+
+        if newX + minX < 0 or newX + maxX >= self.width:  # Проверяем границы по горизонтали
+            return False
+
+        if newY - maxY < 0 or newY - minY >= self.height:  # Проверяем границы по вертикали
+            return False
+
+        rows = self.rows
+        shift = newX + minX
+
+        for dy, mask in PieceTable.rowMasks[shape][rotation]:
+            if rows[newY - dy] & (mask << shift):  # Проверяем на занятые ячейки
+                return False
+
+        return True
+
+    def place(self, shape, rotation, newX, newY):
+        """Устанавливает фигуру на доску."""
+        rows = self.rows
+        colors = self.colors
+        shift = newX + PieceTable.extents[shape][rotation][0]
+
+        for dy, mask in PieceTable.rowMasks[shape][rotation]:
+            rows[newY - dy] |= mask << shift
+
+        heights = self.heights
+        for dx, dy in PieceTable.coords[shape][rotation]:
+            colors[newY - dy][newX + dx] = shape
+            if heights[newX + dx] <= newY - dy:
+                heights[newX + dx] = newY - dy + 1
+
+    def removeFullLines(self):
+        """Удаляет полные линии и возвращает их количество."""
+        fullRow = self.fullRow
+        rows = self.rows
+        keep = [y for y in range(self.height) if rows[y] != fullRow]  # Строки, которые остаются
+        numFullLines = self.height - len(keep)
+
+        if numFullLines:
+            colors = self.colors
+            self.rows = [rows[y] for y in keep] + [0] * numFullLines
+            self.colors = [colors[y] for y in keep] + [bytearray(self.width) for _ in range(numFullLines)]
+            self.heights = self.columnHeights()
+
+        return numFullLines
+
+    def insertGarbage(self, count, hole):
+        """Поднимает стек на count мусорных линий с пустой ячейкой hole; возвращает True, если стек вылез за верх."""
+        keep = self.height - count
+        overflow = any(self.rows[keep:])
+
+        colors = bytearray([Tetrominoe.Garbage]) * self.width
+        colors[hole] = Tetrominoe.NoShape
+        self.rows = [self.fullRow & ~(1 << hole)] * count + self.rows[:keep]
+        self.colors = [bytearray(colors) for _ in range(count)] + self.colors[:keep]
+        self.heights = self.columnHeights()
+
+        return overflow
+
+
+class Action:
+    MoveLeft = 1
+    MoveRight = 2
+    RotateLeft = 3
+    RotateRight = 4
+    DropDown = 5
+    OneLineDown = 6
+
+
+class Rules:
+    """Правила партии: размер доски, таблица очков, кривая гравитации и место появления фигур.
+
+    Все, что движок спрашивает на каждом ходу, считается один раз при
+    создании правил: очки за число линий, клетка появления каждой формы и
+    прямоугольник всей доски.
+    """
+
+    MaxWidth = 63  # Строка доски должна помещаться в int64 (бот и среды обучения)
+    MaxHeight = 1000  # Ограничение форматов повтора и снимка с запасом
+
+    def __init__(self, name='classic', width=10, height=22, lineScores=(0, 100, 200, 300, 400), comboScore=0,
+                 linesPerLevel=10, gravityCurve=(0.3, 0.27, 0.24, 0.21, 0.18, 0.15, 0.12, 0.1, 0.083, 0.067,
+                                                 0.05, 0.05, 0.05, 0.033, 0.033, 0.033, 0.017),
+                 spawnX=None, spawnY=None):
+        if not (4 <= width <= Rules.MaxWidth and 4 <= height <= Rules.MaxHeight):
+            raise ValueError(f"Доска {width}x{height} вне допустимых размеров "
+                             f"4x4 - {Rules.MaxWidth}x{Rules.MaxHeight}")
+        if len(lineScores) < 5:
+            raise ValueError("Таблица очков должна задавать удаление 0-4 линий")
+
+        self.name = name  # Имя набора правил (сохраняется в повторах и снимках)
+        self.width = width  # Ширина доски
+        self.height = height  # Высота доски
+        self.lineScores = tuple(lineScores)  # Очки за удаление 0, 1, 2, 3, 4 линий одной фигурой
+        self.comboScore = comboScore  # Надбавка за каждую фигуру в серии подряд удаляющих линии
+        self.linesPerLevel = linesPerLevel  # Сколько линий нужно удалить для перехода на следующий уровень
+        self.gravityCurve = tuple(gravityCurve)  # Секунд на строку по уровням
+        self.spawnX = min(width // 2 + 1, width - 2) if spawnX is None else spawnX  # Столбец появления фигуры
+        self.spawnY = height - 1 if spawnY is None else spawnY  # Строка верхней клетки новой фигуры
+        if not (1 <= self.spawnX <= width - 2 and 3 <= self.spawnY <= height - 1):
+            raise ValueError(f"Фигура в точке появления ({self.spawnX}, {self.spawnY}) не помещается на доску")
+
+        self.maxLevel = len(self.gravityCurve) - 1  # Дальше гравитация не ускоряется
+        self.spawns = tuple((self.spawnX, self.spawnY + rotations[0][2])
+                            for rotations in PieceTable.extents)  # (x, y) появления каждой формы
+        self.bounds = (0, 0, width - 1, height - 1)  # Прямоугольник всей доски
+
+    def resized(self, width, height):
+        """Возвращает те же правила для доски другого размера."""
+        return Rules(self.name, width, height, self.lineScores, self.comboScore, self.linesPerLevel,
+                     self.gravityCurve)
+
+    def score(self, numFullLines, combo):
+        """Возвращает очки за удаление линий; combo - сколько фигур подряд до этой тоже удаляли линии."""
+        return self.lineScores[numFullLines] + self.comboScore * combo
+
+
+rulesets = {
+    'classic': Rules(),
+    'guideline': Rules('guideline', lineScores=(0, 100, 300, 500, 800), comboScore=50),
+}  # Наборы правил по имени
+
+
+def makeRules(name='classic', size=None):
+    """Возвращает набор правил по имени, при необходимости для доски size вида '20x40'."""
+    rules = rulesets[name]
+    if size:
+        width, _, height = size.lower().partition('x')
+        rules = rules.resized(int(width), int(height))
+    return rules
+
+
+class Engine:
+    """Правила игры и состояние доски без зависимости от Qt.
+
+    Виджет подписывается на события через обработчики onChanged,
+    onStackChanged, onLinesRemoved и onGameOver; без них движок работает полностью
+    автономно (для ботов, повторов и тестов). Размер доски, очки и
+    гравитацию задают правила Rules.
+    """
+
+    def __init__(self, boardClass=BitBoard, generator=None, rules=None):
+        self.onChanged = None  # Вызывается с прямоугольником изменившихся клеток (minX, minY, maxX, maxY)
+        self.onStackChanged = None  # Вызывается с прямоугольником изменившихся клеток стека
+        self.onLinesRemoved = None  # Вызывается с количеством удаленных линий
+        self.onGameOver = None  # Вызывается, когда новую фигуру некуда поставить
+        self.onAction = None  # Вызывается с действием игрока (Action) перед его выполнением
+        self.onStep = None  # Вызывается перед каждым шагом гравитации
+
+        self.isStarted = False  # Игра не начата
+        self.isWaitingAfterLine = False  # Флаг ожидания после удаления линии
+        self.curShape = Tetrominoe.NoShape  # Форма текущей фигуры
+        self.curRotation = 0  # Индекс поворота текущей фигуры
+        self.curX = 0  # Текущая позиция X
+        self.curY = 0  # Текущая позиция Y
+        self.numLinesRemoved = 0  # Количество удаленных линий
+        self.numPieces = 0  # Количество выпавших фигур
+        self.ticks = 0  # Количество игровых тактов с начала партии
+        self.current_score = 0  # Текущие очки
+        self.combo = 0  # Сколько фигур подряд удалили линии
+        self.rules = rules if rules is not None else rulesets['classic']  # Правила партии
+        self.board = boardClass(self.rules.width, self.rules.height)  # Игровая доска
+        self.generator = generator if generator is not None else RandomGenerator()  # Источник фигур
+
+    def shapeAt(self, x, y):
+        """Определяет форму на позиции доски."""
+        return self.board.shapeAt(x, y)
+
+    def setShapeAt(self, x, y, shape):
+        """Устанавливает форму на доске."""
+        self.board.setShapeAt(x, y, shape)
+
+    def clearBoard(self):
+        """Очищает формы с доски."""
+        self.board.clear()
+        self.changed(stack=True)
+
+    def start(self, seed=None):
+        """Начинает новую игру; без зерна оно выбирается случайно и хранится в generator.seed."""
+        self.generator.reset(seed)  # У каждой партии своя воспроизводимая последовательность фигур
+
+        self.isStarted = True  # Игра начата
+        self.isWaitingAfterLine = False
+        self.numLinesRemoved = 0  # Сбрасываем счетчик удаленных линий
+        self.numPieces = 0  # Сбрасываем счетчик фигур
+        self.ticks = 0  # Сбрасываем счетчик тактов
+        self.current_score = 0  # Сбрасываем текущие очки
+        self.combo = 0
+
+        self.clearBoard()  # Очищаем доску
+        self.newPiece()  # Генерируем новую фигуру
+
+    def step(self):
+        """Выполняет один игровой такт (аналог срабатывания таймера)."""
+        if self.onStep is not None:
+            self.onStep()
+
+        self.ticks += 1
+
+        if self.isWaitingAfterLine:  # Если ждем после удаления линии
+            self.isWaitingAfterLine = False
+            self.newPiece()  # Генерируем новую фигуру
+        else:
+            self.oneLineDown()  # Двигаем фигуру вниз
+
+    def apply(self, action):
+        """Выполняет действие игрока (Action), предварительно сообщив о нем подписчику."""
+        if self.onAction is not None:
+            self.onAction(action)
+
+        if action == Action.MoveLeft:
+            return self.moveLeft()
+        if action == Action.MoveRight:
+            return self.moveRight()
+        if action == Action.RotateLeft:
+            return self.rotateLeft()
+        if action == Action.RotateRight:
+            return self.rotateRight()
+        if action == Action.DropDown:
+            return self.dropDown()
+        if action == Action.OneLineDown:
+            return self.oneLineDown()
+
+        raise ValueError(f"Неизвестное действие: {action}")
+
+    def level(self):
+        """Возвращает текущий уровень, растущий с числом удаленных линий."""
+        return self.numLinesRemoved // self.rules.linesPerLevel
+
+    def gravity(self):
+        """Возвращает время падения фигуры на одну строку на текущем уровне, секунды."""
+        rules = self.rules
+        return rules.gravityCurve[min(self.level(), rules.maxLevel)]
+
+    def moveLeft(self):
+        """Двигает фигуру влево."""
+        return self.tryMove(self.curRotation, self.curX - 1, self.curY)
+
+    def moveRight(self):
+        """Двигает фигуру вправо."""
+        return self.tryMove(self.curRotation, self.curX + 1, self.curY)
+
+    def rotateLeft(self):
+        """Поворачивает фигуру влево."""
+        return self.tryMove((self.curRotation + 1) & 3, self.curX, self.curY)
+
+    def rotateRight(self):
+        """Поворачивает фигуру вправо."""
+        return self.tryMove((self.curRotation - 1) & 3, self.curX, self.curY)
+
+    def dropDown(self):
+        """Уроняет фигуру вниз."""
+        if self.curShape == Tetrominoe.NoShape:  # Фигуры нет: ждем новую или игра окончена
+            return
+
+        self.tryMove(self.curRotation, self.curX, self.dropRow())  # Одно перемещение вместо шага на каждую линию
+        self.pieceDropped()  # Фигура упала
+
+    def dropRow(self):
+        """Возвращает строку, на которую упадет текущая фигура.
+
+        Место падения берется из высот столбцов: фигура встает на верхние
+        занятые ячейки под собой. Перебор строк нужен, только если фигура
+        уже задвинута под нависающий стек.
+        """
+        heights = self.board.heights
+        curX = self.curX
+        newY = max(heights[curX + x] + y for x, y in PieceTable.coords[self.curShape][self.curRotation])
+
+        if newY <= self.curY:  # Над поверхностью стека путь вниз свободен
+            return newY
+
+        fits = self.board.fits
+        newY = self.curY
+        while newY > 0 and fits(self.curShape, self.curRotation, curX, newY - 1):
+            newY -= 1
+        return newY
+
+    def oneLineDown(self):
+        """Двигает фигуру вниз на одну линию."""
+        if self.curShape == Tetrominoe.NoShape:  # Фигуры нет: ждем новую или игра окончена
+            return
+
+        if not self.tryMove(self.curRotation, self.curX, self.curY - 1):  # Если не можем двигаться вниз
+            self.pieceDropped()  # Фигура упала
+
+    def pieceDropped(self):
+        """После падения фигуры, удаляет полные линии и создает новую фигуру."""
+        self.board.place(self.curShape, self.curRotation, self.curX, self.curY)  # Устанавливаем фигуру на доску
+
+        self.numPieces += 1
+        self.removeFullLines()  # Проверяем и удаляем полные линии
+
+        if not self.isWaitingAfterLine:  # Если не ждем после удаления линии
+            self.newPiece()  # Генерируем новую фигуру
+
+    def removeFullLines(self):
+        """Удаляет все полные линии с доски."""
+        numFullLines = self.board.removeFullLines()  # Удаляем полные линии и считаем их
+        bounds = self.pieceBounds(self.curRotation, self.curX, self.curY)  # Клетки упавшей фигуры
+
+        if numFullLines > 0:  # Если есть полные линии
+            self.numLinesRemoved += numFullLines
+            self.current_score += self.rules.score(numFullLines, self.combo)  # Добавляем очки за полные линии
+            self.combo += 1
+
+            bounds = (0, bounds[1], self.board.width - 1, self.board.height - 1)  # Сдвинулось все выше
+
+            if self.onLinesRemoved is not None:
+                self.onLinesRemoved(numFullLines)
+        else:
+            self.combo = 0  # Серия прервалась
+
+        self.isWaitingAfterLine = True  # Устанавливаем флаг ожидания
+        self.curShape = Tetrominoe.NoShape  # Убираем текущую фигуру
+        self.changed(bounds, stack=True)
+
+    def addGarbage(self, count, hole):
+        """Поднимает стек на count мусорных линий с дырой в столбце hole (атака соперника).
+
+        Падающая фигура остается на месте, а если стек ее задел - поднимается
+        над ним. Если стек вылез за верх доски или фигуре некуда подняться,
+        игра заканчивается.
+        """
+        if not self.isStarted or count <= 0:
+            return
+
+        count = min(count, self.board.height)
+        overflow = self.board.insertGarbage(count, hole)
+
+        if self.curShape != Tetrominoe.NoShape and not overflow:
+            fits = self.board.fits
+            newY = self.curY
+            while not fits(self.curShape, self.curRotation, self.curX, newY) and newY < self.curY + count:
+                newY += 1
+            overflow = not fits(self.curShape, self.curRotation, self.curX, newY)
+            self.curY = newY
+
+        self.changed(stack=True)
+
+        if overflow:
+            self.curShape = Tetrominoe.NoShape
+            self.isStarted = False
+
+            if self.onGameOver is not None:
+                self.onGameOver()
+
+    def newPiece(self):
+        """Создает новую фигуру."""
+        self.curShape = self.generator.next()  # Берем форму из очереди предпросмотра
+        self.curRotation = 0
+        self.curX, self.curY = self.rules.spawns[self.curShape]  # Устанавливаем позицию появления
+
+        if not self.tryMove(0, self.curX, self.curY):  # Если не можем установить фигуру
+            self.curShape = Tetrominoe.NoShape  # Убираем фигуру
+            self.isStarted = False  # Игра закончена
+
+            if self.onGameOver is not None:
+                self.onGameOver()
+
+    def tryMove(self, newRotation, newX, newY):
+        """Пытается переместить или повернуть текущую фигуру."""
+        if self.curShape == Tetrominoe.NoShape:  # Двигать нечего
+            return False
+
+        if not self.board.fits(self.curShape, newRotation, newX, newY):  # Проверяем границы и занятые ячейки
+            return False
+
+        oldBounds = self.pieceBounds(self.curRotation, self.curX, self.curY) if self.onChanged is not None else None
+
+        self.curRotation = newRotation  # Устанавливаем новый поворот
+        self.curX = newX  # Обновляем позицию X
+        self.curY = newY  # Обновляем позицию Y
+
+        if oldBounds is not None:  # Перерисовать нужно старое и новое место фигуры
+            oldMinX, oldMinY, oldMaxX, oldMaxY = oldBounds
+            newMinX, newMinY, newMaxX, newMaxY = self.pieceBounds(newRotation, newX, newY)
+            self.onChanged((min(oldMinX, newMinX), min(oldMinY, newMinY),
+                            max(oldMaxX, newMaxX), max(oldMaxY, newMaxY)))
+
+        return True  # Успешное движение
+
+    def preview(self, n=1):
+        """Возвращает n следующих форм без изменения состояния игры."""
+        return self.generator.preview(n)
+
+    def pieceCells(self, curY=None):
+        """Возвращает клетки текущей фигуры в координатах доски (по умолчанию - в ее строке)."""
+        curX = self.curX
+        curY = self.curY if curY is None else curY
+        return [(curX + x, curY - y) for x, y in PieceTable.coords[self.curShape][self.curRotation]]
+
+    def pieceBounds(self, rotation, x, y):
+        """Возвращает прямоугольник (minX, minY, maxX, maxY), занятый текущей фигурой."""
+        minX, maxX, minY, maxY = PieceTable.extents[self.curShape][rotation]
+        return x + minX, y - maxY, x + maxX, y - minY
+
+    def changed(self, bounds=None, stack=False):
+        """Сообщает подписчикам об изменившихся клетках (по умолчанию - о всей доске)."""
+        if bounds is None:
+            bounds = self.rules.bounds
+
+        if stack and self.onStackChanged is not None:  # Изменились зафиксированные клетки
+            self.onStackChanged(bounds)
+
+        if self.onChanged is not None:
+            self.onChanged(bounds)
@@ -0,0 +1,239 @@
+"""Среда для обучения с подкреплением в стиле Gymnasium: reset(seed) и step(action).
+
+Агент выбирает место фигуры, а не нажатия клавиш: действие a задает
+поворот a // ширина и столбец a % ширина, после чего фигура падает сверху
+на стек (как при сбросе без сдвигов под нависающими клетками). Столбец,
+при котором фигура вылезает за край, сдвигается до ближайшего
+допустимого, поэтому любое действие из [0, 4 * ширина) разрешено.
+Награда - очки по правилам партии, эпизод кончается, когда фигура не
+помещается на доску или новой некуда появиться.
+
+Наблюдение - словарь: 'board' - занятость доски (высота, ширина) из
+uint8, строка 0 нижняя; 'piece' и 'next' - текущая и следующая формы.
+
+TetrisEnv ведет одну партию на движке Engine. VecTetrisEnv ведет B партий
+сразу на массивах NumPy (доски (B, высота, ширина)) и делает один шаг
+всех партий за вызов; законченные партии сразу начинаются заново.
+Если установлен gymnasium, у сред есть action_space и observation_space.
+"""
+import numpy as np
+
+from engine import Engine, PieceTable, Tetrominoe, rulesets
+from generator import generators
+
+try:
+    from gymnasium import spaces
+except ImportError:  # Среды работают и без gymnasium, только без описания пространств
+    spaces = None
+
+
+class Placements:
+    """Таблицы размещений для правил: действие -> (поворот, столбец) и клетки фигур в массивах."""
+
+    def __init__(self, rules):
+        width = rules.width
+        shapes = len(PieceTable.coords)
+        self.count = 4 * width  # Число действий
+
+        self.rotations = np.zeros((shapes, self.count), dtype=np.int64)  # Поворот по форме и действию
+        self.columns = np.zeros((shapes, self.count), dtype=np.int64)  # Столбец (curX) по форме и действию
+        for shape in range(shapes):
+            for action in range(self.count):
+                rotation, x = divmod(action, width)
+                minX, maxX = PieceTable.extents[shape][rotation][:2]
+                self.rotations[shape, action] = rotation
+                self.columns[shape, action] = min(max(x, -minX), width - 1 - maxX)  # Фигура не за краем
+
+        self.dx = np.array([[[x for x, _ in coords] for coords in rotations]
+                            for rotations in PieceTable.coords])  # Смещения клеток (форма, поворот, 4)
+        self.dy = np.array([[[y for _, y in coords] for coords in rotations]
+                            for rotations in PieceTable.coords])
+
+        self.spawnColumns = np.array([[x + dx for dx, _ in rotations[0]]
+                                      for (x, _), rotations in zip(rules.spawns, PieceTable.coords)])
+        self.spawnRows = np.array([[y - dy for _, dy in rotations[0]]
+                                   for (_, y), rotations in zip(rules.spawns, PieceTable.coords)])
+        self.lineScores = np.array(rules.lineScores, dtype=np.int64)  # Очки за 0-4 линии
+
+    def spaces(self, rules, shape=()):
+        """Возвращает (action_space, observation_space) gymnasium для пакета формы shape."""
+        if spaces is None:
+            return None, None
+
+        shapes = len(PieceTable.coords)
+        if not shape:
+            return spaces.Discrete(self.count), spaces.Dict({
+                'board': spaces.Box(0, 1, (rules.height, rules.width), np.uint8),
+                'piece': spaces.Discrete(shapes),
+                'next': spaces.Discrete(shapes),
+            })
+
+        return spaces.MultiDiscrete(np.full(shape, self.count)), spaces.Dict({
+            'board': spaces.Box(0, 1, shape + (rules.height, rules.width), np.uint8),
+            'piece': spaces.MultiDiscrete(np.full(shape, shapes)),
+            'next': spaces.MultiDiscrete(np.full(shape, shapes)),
+        })
+
+
+class TetrisEnv:
+    """Одна партия на движке Engine с действиями-размещениями."""
+
+    def __init__(self, rules=None, generator='bag'):
+        self.rules = rules if rules is not None else rulesets['classic']  # Правила партии
+        self.engine = Engine(generator=generators[generator](), rules=self.rules)
+        self.placements = Placements(self.rules)
+        self.action_space, self.observation_space = self.placements.spaces(self.rules)
+
+    def reset(self, seed=None, options=None):
+        """Начинает новую партию; возвращает (наблюдение, сведения)."""
+        self.engine.start(seed)
+        return self.observation(), self.info()
+
+    def step(self, action):
+        """Ставит текущую фигуру по действию; возвращает (наблюдение, награда, конец, обрезано, сведения)."""
+        engine = self.engine
+        if not engine.isStarted:
+            raise RuntimeError("Партия окончена: вызовите reset()")
+
+        shape = engine.curShape
+        rotation = int(self.placements.rotations[shape, action])
+        x = int(self.placements.columns[shape, action])
+        heights = engine.board.heights
+        y = max(heights[x + dx] + dy for dx, dy in PieceTable.coords[shape][rotation])  # Падение сверху на стек
+
+        score = engine.current_score
+        if engine.board.fits(shape, rotation, x, y):
+            engine.curRotation, engine.curX, engine.curY = rotation, x, y
+            engine.pieceDropped()  # Фиксируем фигуру и удаляем линии
+            engine.step()  # Появляется следующая фигура (или некуда - конец партии)
+        else:  # Фигура не помещается на доску
+            engine.curShape = Tetrominoe.NoShape
+            engine.isStarted = False
+
+        return self.observation(), engine.current_score - score, not engine.isStarted, False, self.info()
+
+    def observation(self):
+        """Возвращает наблюдение: занятость доски и формы текущей и следующей фигур."""
+        engine = self.engine
+        bits = np.array(engine.board.rowBits(), dtype=np.int64)
+        return {
+            'board': ((bits[:, None] >> np.arange(self.rules.width)) & 1).astype(np.uint8),
+            'piece': engine.curShape,
+            'next': engine.preview(1)[0],
+        }
+
+    def info(self):
+        """Возвращает сведения о партии."""
+        engine = self.engine
+        return {'score': engine.current_score, 'lines': engine.numLinesRemoved, 'pieces': engine.numPieces}
+
+
+class VecTetrisEnv:
+    """B независимых партий на массивах NumPy; step() делает ход во всех сразу.
+
+    Партия, закончившаяся на шаге, тут же начинается заново со следующим
+    зерном: в возвращенном наблюдении уже новая доска, а итог прошедшей
+    партии лежит в сведениях 'final_score', 'final_lines' и 'final_pieces'.
+    """
+
+    def __init__(self, count, rules=None, generator='bag'):
+        self.count = count  # Число партий
+        self.rules = rules if rules is not None else rulesets['classic']
+        self.placements = Placements(self.rules)
+        self.action_space, self.observation_space = self.placements.spaces(self.rules, (count,))
+
+        height, width = self.rules.height, self.rules.width
+        self.boards = np.zeros((count, height, width), dtype=bool)  # Занятость досок
+        self.heights = np.zeros((count, width), dtype=np.int64)  # Высота столбцов
+        self.pieces = np.zeros(count, dtype=np.int64)  # Текущие формы
+        self.nexts = np.zeros(count, dtype=np.int64)  # Следующие формы
+        self.combos = np.zeros(count, dtype=np.int64)  # Серии удалений подряд
+        self.scores = np.zeros(count, dtype=np.int64)
+        self.lines = np.zeros(count, dtype=np.int64)
+        self.numPieces = np.zeros(count, dtype=np.int64)
+        self.generators = [generators[generator]() for _ in range(count)]  # Источник фигур каждой партии
+        self.nextSeed = 0  # Зерно следующей начатой партии
+        self.index = np.arange(count)
+
+    def reset(self, seed=None, options=None):
+        """Начинает все партии заново; партия i получает зерно seed + i."""
+        self.nextSeed = seed if seed is not None else int(np.random.SeedSequence().entropy % 2 ** 32)
+        self.restart(self.index)
+        return self.observation(), self.info()
+
+    def restart(self, games):
+        """Начинает партии games заново со следующими зернами."""
+        self.boards[games] = False
+        self.heights[games] = 0
+        self.combos[games] = 0
+        self.scores[games] = 0
+        self.lines[games] = 0
+        self.numPieces[games] = 0
+
+        for game in games:
+            generator = self.generators[game]
+            generator.reset(self.nextSeed)
+            self.nextSeed += 1
+            self.pieces[game] = generator.next()
+            self.nexts[game] = generator.next()
+
+    def step(self, actions):
+        """Ставит текущие фигуры всех партий по массиву действий (B,)."""
+        placements = self.placements
+        height = self.rules.height
+        index = self.index
+        shapes = self.pieces
+
+        rotations = placements.rotations[shapes, actions]
+        columns = placements.columns[shapes, actions][:, None] + placements.dx[shapes, rotations]  # (B, 4)
+        dy = placements.dy[shapes, rotations]
+        landY = (np.take_along_axis(self.heights, columns, axis=1) + dy).max(axis=1)  # Падение сверху на стек
+        rows = landY[:, None] - dy
+
+        toppedOut = rows.max(axis=1) >= height  # Фигура не помещается на доску
+        placed = ~toppedOut
+        self.boards[index[placed, None], rows[placed], columns[placed]] = True
+        np.maximum.at(self.heights, (index[placed, None], columns[placed]), rows[placed] + 1)
+        self.numPieces += placed
+
+        # Удаление полных линий только на досках, где они есть
+        full = self.boards.all(axis=2)  # (B, высота)
+        numFull = full.sum(axis=1)
+        cleared = np.flatnonzero(numFull)
+        if len(cleared):
+            order = np.argsort(full[cleared], axis=1, kind='stable')  # Неполные строки вниз по порядку
+            boards = np.take_along_axis(self.boards[cleared], order[:, :, None], axis=1)
+            boards[np.arange(height)[None, :] >= height - numFull[cleared, None]] = False  # Сверху пустые строки
+            self.boards[cleared] = boards
+            self.heights[cleared] = (boards * np.arange(1, height + 1)[None, :, None]).max(axis=1)
+
+        rewards = placements.lineScores[numFull] + self.rules.comboScore * self.combos * (numFull > 0)
+        self.combos = np.where(numFull > 0, self.combos + 1, 0)
+        self.scores += rewards
+        self.lines += numFull
+
+        for game in np.flatnonzero(placed):  # Следующая фигура из очереди предпросмотра
+            self.pieces[game] = self.nexts[game]
+            self.nexts[game] = self.generators[game].next()
+
+        blocked = self.boards[index[:, None], placements.spawnRows[self.pieces],
+                              placements.spawnColumns[self.pieces]].any(axis=1)  # Новой фигуре некуда появиться
+        terminated = toppedOut | blocked
+
+        info = self.info()
+        finished = np.flatnonzero(terminated)
+        if len(finished):
+            info['final_score'] = info['score'].copy()
+            info['final_lines'] = info['lines'].copy()
+            info['final_pieces'] = info['pieces'].copy()
+            self.restart(finished)
+
+        return self.observation(), rewards, terminated, np.zeros(self.count, dtype=bool), info
+
+    def observation(self):
+        """Возвращает наблюдения всех партий."""
+        return {'board': self.boards.astype(np.uint8), 'piece': self.pieces.copy(), 'next': self.nexts.copy()}
+
+    def info(self):
+        """Возвращает сведения о партиях массивами (B,)."""
+        return {'score': self.scores.copy(), 'lines': self.lines.copy(), 'pieces': self.numPieces.copy()}
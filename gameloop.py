@@ -0,0 +1,120 @@
+"""Игровой цикл с фиксированным шагом, независимый от частоты отрисовки и Qt.
+
+Цикл переводит реальное время в целое число тактов длиной 1/tickRate
+секунды и на каждом такте обрабатывает удерживаемые клавиши (DAS/ARR) и
+гравитацию. Поэтому скорость игры и повтор клавиш не зависят ни от
+точности таймера окна, ни от настроек автоповтора системы.
+"""
+from engine import Action
+
+
+class GameLoop:
+    """Фиксированный шаг симуляции поверх движка.
+
+    Клавиши сообщаются через press/release; движения влево, вправо и вниз
+    повторяются, пока клавиша удерживается: первый повтор через Das
+    секунд, следующие - каждые Arr секунд. Фигура опускается на строку раз
+    в Engine.gravity() секунд, округленных до тактов.
+    """
+
+    TickRate = 60  # Тактов симуляции в секунду
+    Das = 0.167  # Задержка перед автоповтором, секунды
+    Arr = 0.033  # Период автоповтора, секунды
+    MaxCatchUp = 10  # Больше тактов за один вызов не догоняем, чтобы не зависнуть после остановки
+
+    Repeating = (Action.MoveLeft, Action.MoveRight, Action.OneLineDown)  # Действия с автоповтором
+    Opposite = {Action.MoveLeft: Action.MoveRight, Action.MoveRight: Action.MoveLeft}
+
+    def __init__(self, engine, tickRate=TickRate):
+        self.engine = engine
+        self.tickRate = tickRate  # Тактов в секунду
+        self.tickLength = 1.0 / tickRate  # Длина такта, секунды
+        self.dasTicks = max(1, round(GameLoop.Das * tickRate))  # Задержка автоповтора в тактах
+        self.arrTicks = max(1, round(GameLoop.Arr * tickRate))  # Период автоповтора в тактах
+        self.onGravity = None  # Вызывается вместо engine.step() при срабатывании гравитации
+
+        self.lastTime = None  # Время последнего обновления; None - цикл остановлен
+        self.accumulator = 0.0  # Непрожитое время меньше такта
+        self.gravityCounter = 0  # Тактов с последнего шага гравитации
+        self.held = {}  # Удерживаемые действия и сколько тактов они удерживаются
+
+    def timerInterval(self):
+        """Возвращает период таймера окна в миллисекундах."""
+        return max(1, int(1000 * self.tickLength))
+
+    def start(self, now):
+        """Запускает цикл с начала партии."""
+        self.gravityCounter = 0
+        self.resume(now)
+
+    def resume(self, now):
+        """Продолжает цикл, не догоняя время простоя."""
+        self.lastTime = now
+        self.accumulator = 0.0
+        self.held.clear()
+
+    def stop(self):
+        """Останавливает цикл; оставшиеся такты текущего вызова advance не выполняются."""
+        self.lastTime = None
+        self.held.clear()
+
+    def press(self, action):
+        """Нажатие клавиши: действие выполняется сразу, повторяемые запоминаются."""
+        if action in self.held:  # Клавиша уже удерживается
+            return
+
+        if action in GameLoop.Repeating:
+            self.held.pop(GameLoop.Opposite.get(action), None)  # Последнее направление важнее
+            self.held[action] = 0
+
+        self.engine.apply(action)
+
+    def release(self, action):
+        """Отпускание клавиши."""
+        self.held.pop(action, None)
+
+    def gravityTicks(self):
+        """Возвращает число тактов между шагами гравитации на текущем уровне."""
+        return max(1, round(self.engine.gravity() * self.tickRate))
+
+    def advance(self, now):
+        """Выполняет такты за время, прошедшее с прошлого вызова; возвращает их число."""
+        if self.lastTime is None:
+            return 0
+
+        self.accumulator += now - self.lastTime
+        self.lastTime = now
+        ticks = 0
+
+        while self.accumulator >= self.tickLength and self.lastTime is not None:
+            self.accumulator -= self.tickLength
+            self.tick()
+            ticks += 1
+
+            if ticks == GameLoop.MaxCatchUp:  # Слишком отстали: пропускаем остаток
+                self.accumulator = 0.0
+                break
+
+        return ticks
+
+    def tick(self):
+        """Один такт: автоповтор удерживаемых клавиш и гравитация."""
+        for action, held in list(self.held.items()):
+            if action not in self.held:  # Отпущено или цикл остановлен внутри предыдущего действия
+                continue
+
+            held += 1
+            self.held[action] = held
+            if held >= self.dasTicks and (held - self.dasTicks) % self.arrTicks == 0:
+                self.engine.apply(action)
+
+        if self.lastTime is None:  # Игра закончилась на автоповторе
+            return
+
+        self.gravityCounter += 1
+        if self.gravityCounter >= self.gravityTicks():
+            self.gravityCounter = 0
+            if self.onGravity is not None:
+                self.onGravity()
+            else:
+                self.engine.step()
@@ -0,0 +1,70 @@
+import collections
+import itertools
+import random
+
+
+class PieceGenerator:
+    """Источник фигур со своим генератором случайных чисел и очередью предпросмотра.
+
+    Наследники задают стратегию в refill(), возвращая следующую порцию
+    форм; очередь достраивается лениво, только когда ее просматривают или
+    из нее берут фигуру. Одно и то же зерно всегда дает одну и ту же
+    последовательность.
+    """
+
+    def __init__(self, seed=None):
+        self.seed = 0  # Зерно текущей последовательности
+        self.rng = random.Random()  # Генератор случайных чисел партии
+        self.queue = collections.deque()  # Очередь предпросмотра
+        self.count = 0  # Сколько фигур уже выдано
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Начинает последовательность заново; без зерна выбирает его случайно."""
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+
+        self.seed = seed
+        self.rng.seed(seed)
+        self.queue.clear()
+        self.count = 0
+
+    def refill(self):
+        """Возвращает следующую порцию форм."""
+        raise NotImplementedError
+
+    def preview(self, n):
+        """Возвращает n следующих форм, не забирая их из очереди."""
+        while len(self.queue) < n:
+            self.queue.extend(self.refill())
+
+        return list(itertools.islice(self.queue, n))
+
+    def next(self):
+        """Забирает следующую форму из очереди."""
+        if not self.queue:
+            self.queue.extend(self.refill())
+
+        self.count += 1
+        return self.queue.popleft()
+
+
+class RandomGenerator(PieceGenerator):
+    """Каждая фигура выбирается независимо и равновероятно."""
+
+    def refill(self):
+        """Возвращает одну случайную форму."""
+        return (self.rng.randint(1, 7),)
+
+
+class BagGenerator(PieceGenerator):
+    """Фигуры выдаются перемешанными мешками, в каждом все семь форм по разу."""
+
+    def refill(self):
+        """Возвращает перемешанный мешок из семи форм."""
+        bag = list(range(1, 8))
+        self.rng.shuffle(bag)
+        return bag
+
+
+generators = {'random': RandomGenerator, 'bag': BagGenerator}  # Стратегии по имени
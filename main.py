@@ -1,49 +1,54 @@
-import random
+import argparse
+import getpass
+import os
+import struct
 import sys
-import sqlite3
-from PyQt6.QtCore import Qt, QBasicTimer, pyqtSignal
-from PyQt6.QtGui import QPainter, QColor, QFont
-from PyQt6.QtWidgets import QMainWindow, QFrame, QApplication, QLabel, QVBoxLayout, QWidget, QMessageBox
-
+import time
+from datetime import datetime
 
-class Database:
-    def __init__(self):
-        self.connection = sqlite3.connect('tetris_scores.db')  # Устанавливаем соединение с базой данных
-        self.create_table()  # Создаем таблицу для хранения очков
-
-    def create_table(self):
-        """Создает таблицу очков, если она еще не существует."""
-        with self.connection:
-            self.connection.execute('''
-                CREATE TABLE IF NOT EXISTS scores (
-                    id INTEGER PRIMARY KEY,
-                    score INTEGER NOT NULL
-                )
-            ''')
+from PyQt6.QtCore import Qt, QBasicTimer, QRect, QTimer, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QFont, QPixmap
+from PyQt6.QtWidgets import QMainWindow, QFrame, QApplication, QLabel, QVBoxLayout, QWidget, QMessageBox
 
-    def insert_score(self, score):
-        """Вставляет новый счет в базу данных."""
-        with self.connection:
-            self.connection.execute('INSERT INTO scores (score) VALUES (?)', (score,))
+from bot import Bot
+from database import Database
+from engine import Action, Engine, Tetrominoe, makeRules, rulesets
+from gameloop import GameLoop
+from profiler import Profiler
+import snapshot
+from replay import Recorder, Replay
+from versus import Versus
 
-    def get_max_score(self):
-        """Извлекает максимальный счет из базы данных."""
-        cursor = self.connection.cursor()
-        cursor.execute('SELECT MAX(score) FROM scores')
-        result = cursor.fetchone()
-        return result[0] if result[0] is not None else 0
 
-    def close(self):
-        """Закрывает соединение с базой данных."""
-        self.connection.close()
+class Tetris(QMainWindow):
+    maxScoreLoaded = pyqtSignal(int)  # Максимальный счет, прочитанный потоком базы данных
 
+    SnapshotPath = 'tetris_save.bin'  # Файл снимка незаконченной партии (классические правила)
 
-class Tetris(QMainWindow):
-    def __init__(self):
+    def __init__(self, recordDir=None, replay=None, profilePath=None, tickRate=GameLoop.TickRate, versus=None,
+                 rules=None):
         super().__init__()
-        self.db = Database()  # Инициализируем базу данных
-        self.max_score = self.db.get_max_score()  # Получаем максимальный счет из базы данных
+        self.rules = replay.rules if replay is not None else rules or rulesets['classic']  # Правила партии
+        self.versus = versus  # Сетевой матч, если игра идет по сети
+        self.tickRate = tickRate  # Частота игрового цикла, тактов в секунду
+        self.recordDir = recordDir  # Каталог для записи повторов партий
+        self.replay = replay  # Показываемый повтор
+        self.profilePath = profilePath  # Файл для отчета профилировщика
+        self.profiler = Profiler() if profilePath else None  # Замер горячих участков, если включен
+        timings = None  # Замеры открытия базы, записи пакетов и чтения рекорда в потоке-писателе
+        if self.profiler is not None:  # Гистограммы создаются до запуска потока-писателя
+            timings = {name: self.profiler.histogram('db.' + name).add for name in ('open', 'commit', 'max')}
+        self.db = Database(timings=timings)  # Инициализируем базу данных
+        self.snapshots = snapshot.Writer()  # Снимки партии пишутся на диск в фоновом потоке
+
+        if self.profiler is not None:
+            self.profiler.instrument(self.db, ('insert_game', 'flush'), 'db.')
+
+        self.player = getpass.getuser()  # Имя игрока для таблицы рекордов
+        self.max_score = 0  # Максимальный счет, пока база данных открывается
         self.initUI()  # Инициализируем пользовательский интерфейс
+        self.maxScoreLoaded.connect(self.showMaxScore, Qt.ConnectionType.QueuedConnection)
+        self.db.request_max_score(self.maxScoreLoaded.emit)  # Рекорд прочитает поток базы данных
 
     def initUI(self):
         # Создаем центральный виджет и макет
@@ -62,7 +67,8 @@ class Tetris(QMainWindow):
             "Пробел : Уронить фигуру\n"
             "P : Пауза/Продолжить\n"
             "D : Двигать вниз на одну линию\n"
-            "R : Перезапустить игру"  # Добавлено управление для перезапуска игры
+            "R : Перезапустить игру\n"  # Добавлено управление для перезапуска игры
+            "B : Включить/выключить бота"
         )
         instructions_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         instructions_label.setFont(QFont('Arial', 10))
@@ -75,6 +81,8 @@ class Tetris(QMainWindow):
 
         # Добавляем доску и инструкции в макет
         main_layout.addWidget(self.tboard)
+        if self.versus is not None:
+            main_layout.addWidget(self.versus.attach(self.tboard))  # Доски соперников
         main_layout.addWidget(instructions_label)
 
         # Устанавливаем макет для центрального виджета
@@ -84,16 +92,39 @@ class Tetris(QMainWindow):
         self.statusbar = self.statusBar()
         self.tboard.msg2Statusbar[str].connect(self.statusbar.showMessage)  # Подключаем сигнал к статусной строке
 
-        self.tboard.start()  # Запускаем игру
+        if self.versus is None:
+            if self.replay is not None or not self.tboard.restore():  # Продолжаем сохраненную партию
+                self.tboard.start()  # Запускаем игру
+        else:
+            self.statusbar.showMessage("Ожидание игроков...")  # Матч начнет сервер
 
-        self.resize(200, 500)  # Устанавливаем размер окна
+        self.resize(20 * self.rules.width, 500 + 20 * (self.rules.height - 22))  # Размер окна по размеру доски
         self.center()  # Центрируем окно
         self.setWindowTitle('Тетрис')  # Устанавливаем заголовок окна
         self.show()  # Показываем окно
 
+    def showMaxScore(self, score):
+        """Показывает максимальный счет, прочитанный из базы данных."""
+        if not self.isVisible():  # Окно уже закрыто вместе с базой данных
+            return
+
+        self.max_score = max(self.max_score, score)
+
+        if self.tboard.engine.isStarted and not self.tboard.isPaused and self.versus is None:
+            self.tboard.showScore()
+
     def closeEvent(self, event):
         """Обрабатывает событие закрытия окна, чтобы правильно закрыть базу данных."""
-        self.db.close()  # Закрываем соединение с базой данных
+        if not self.tboard.saveSnapshot():  # Незаконченную партию можно продолжить при следующем запуске
+            self.tboard.recordGame()  # Иначе сохраняем ее результат
+        self.snapshots.close()  # Дожидаемся записи снимка
+        self.db.close()  # Дописываем очередь очков и закрываем соединение с базой данных
+
+        if self.versus is not None:
+            self.versus.close()  # Соперники увидят, что мы выбыли
+
+        if self.profiler is not None:
+            self.profiler.export(self.profilePath)  # Сохраняем отчет профилировщика
         event.accept()  # Принимаем событие закрытия
 
     def center(self):
@@ -107,9 +138,19 @@ class Tetris(QMainWindow):
 class Board(QFrame):
     msg2Statusbar = pyqtSignal(str)  # Сигнал для передачи сообщений в строку состояния
 
-    BoardWidth = 10  # Ширина доски
-    BoardHeight = 22  # Высота доски
-    Speed = 300  # Скорость игры
+    colorTable = (0x000000, 0xCC6666, 0x66CC66, 0x6666CC,
+                  0xCCCC66, 0xCC66CC, 0x66CCCC, 0xDAAA00, 0x888888)  # Цвета форм и мусорных линий
+
+    keyActions = {
+        Qt.Key.Key_Left.value: Action.MoveLeft,  # Двигать влево
+        Qt.Key.Key_Right.value: Action.MoveRight,  # Двигать вправо
+        Qt.Key.Key_Down.value: Action.RotateRight,  # Повернуть вправо
+        Qt.Key.Key_Up.value: Action.RotateLeft,  # Повернуть влево
+        Qt.Key.Key_Space.value: Action.DropDown,  # Уронить фигуру
+        Qt.Key.Key_D.value: Action.OneLineDown,  # Двигать вниз на одну линию
+    }  # Действия клавиш управления фигурой
+
+    SnapshotInterval = 5.0  # Как часто сохранять снимок партии, секунды
 
     def __init__(self, parent):
         super().__init__(parent)
@@ -119,231 +160,335 @@ class Board(QFrame):
     def initBoard(self):
         """Инициализирует игровую доску."""
         self.timer = QBasicTimer()  # Инициализируем таймер
-        self.isWaitingAfterLine = False  # Флаг ожидания после удаления линии
-        self.curX = 0  # Текущая позиция X
-        self.curY = 0  # Текущая позиция Y
-        self.numLinesRemoved = 0  # Количество удаленных линий
-        self.board = []  # Игровая доска
-        self.current_score = 0  # Инициализация текущих очков
+        replay = self.parent_tetris.replay
+        rules = self.parent_tetris.rules
+        self.engine = replay.newEngine() if replay is not None else Engine(rules=rules)  # Игровая логика без Qt
+        self.boardWidth = self.engine.board.width  # Ширина доски в клетках
+        self.boardHeight = self.engine.board.height  # Высота доски в клетках
+        self.engine.onChanged = self.updateCells  # Перерисовываем только изменившиеся клетки
+        self.engine.onStackChanged = self.stackChanged  # Обновляем слой зафиксированных фигур
+        self.engine.onLinesRemoved = self.linesRemoved
+        self.engine.onGameOver = self.gameOver
+
+        self.loop = GameLoop(self.engine, self.parent_tetris.tickRate)  # Фиксированный шаг симуляции
+        self.loop.onGravity = self.gravityStep
+
+        self.tileSize = (0, 0)  # Размер клетки, для которого построены плитки
+        self.tiles = []  # Заранее нарисованные клетки каждой формы
+        self.ghostTiles = []  # Клетки тени фигуры на месте падения
+        self.ghostBounds = None  # Прямоугольник тени, нарисованной последней
+        self.stackLayer = None  # Слой с зафиксированными фигурами
+
+        self.gameStartedAt = 0.0  # Время начала партии
+        self.gameRecorded = True  # Результат партии уже сохранен
+        self.snapshotPath = snapshot.pathFor(rules, Tetris.SnapshotPath)  # Свой снимок у каждых правил
+        self.snapshotAt = 0.0  # Время последнего сохранения снимка
 
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)  # Устанавливаем фокус на доске
-        self.isStarted = False  # Игра не начата
         self.isPaused = False  # Игра не на паузе
-        self.clearBoard()  # Очищаем доску
-
-    def shapeAt(self, x, y):
-        """Определяет форму на позиции доски."""
-        return self.board[(y * Board.BoardWidth) + x]
-
-    def setShapeAt(self, x, y, shape):
-        """Устанавливает форму на доске."""
-        self.board[(y * Board.BoardWidth) + x] = shape
+        self.bot = None  # Автоигрок, если включен
+        self.recorder = None  # Запись повтора текущей партии
+        self.replayPos = 0  # Индекс следующего события повтора
+
+        self.overlay = None  # Оверлей с замерами профилировщика
+        profiler = self.parent_tetris.profiler
+        if profiler is not None:
+            profiler.instrument(self.engine, ('tryMove', 'removeFullLines', 'pieceDropped'), 'engine.')
+            profiler.instrument(self, ('paintEvent', 'timerEvent'))
+
+            self.overlay = QLabel(self)
+            self.overlay.setFont(QFont('Monospace', 7))
+            self.overlay.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: white; padding: 2px;")
+            self.overlayTimer = QTimer(self)  # Обновляем оверлей дважды в секунду, а не каждый кадр
+            self.overlayTimer.timeout.connect(self.refreshOverlay)
+            self.overlayTimer.start(500)
 
     def squareWidth(self):
         """Возвращает ширину одного квадрата."""
-        return self.contentsRect().width() // Board.BoardWidth
+        return self.contentsRect().width() // self.boardWidth
 
     def squareHeight(self):
         """Возвращает высоту одного квадрата."""
-        return self.contentsRect().height() // Board.BoardHeight
+        return self.contentsRect().height() // self.boardHeight
 
-    def start(self):
-        """Начинает игру."""
+    def start(self, seed=None):
+        """Начинает игру; зерно задают повтор или сетевой матч."""
         if self.isPaused:
             return  # Если игра на паузе, возвращаемся
 
-        self.isStarted = True  # Игра начата
-        self.isWaitingAfterLine = False
-        self.numLinesRemoved = 0  # Сбрасываем счетчик удаленных линий
-        self.current_score = 0  # Сбрасываем текущие очки
-
-        self.clearBoard()  # Очищаем доску
-
         # Передаем текущее и максимальное количество очков в строку состояния
-        self.msg2Statusbar.emit(f"Очки: {self.current_score} | Макс Очки: {self.parent_tetris.max_score}")
-
-        self.newPiece()  # Генерируем новую фигуру
-        self.timer.start(Board.Speed, self)  # Запускаем таймер
+        self.msg2Statusbar.emit(f"Очки: 0 | Уровень: 0 | Макс Очки: {self.parent_tetris.max_score}")
+
+        self.gameStartedAt = time.monotonic()  # Запоминаем время начала партии
+        self.gameRecorded = False
+        self.replayPos = 0
+
+        replay = self.parent_tetris.replay
+        versus = self.parent_tetris.versus
+        if replay is not None:
+            seed = replay.seed
+        elif versus is None:
+            self.parent_tetris.snapshots.remove(self.snapshotPath)  # Новая партия заменяет сохраненную
+        self.engine.start(seed)  # Очищаем доску и генерируем новую фигуру
+
+        if self.parent_tetris.recordDir is not None and replay is None and versus is None:
+            self.recorder = Recorder(self.engine)  # Записываем действия игрока (мусорные линии в повтор не попадают)
+
+        if versus is not None:
+            versus.hook(self.engine)  # Соперники повторяют наши шаги и действия
+
+        if self.engine.isStarted:
+            self.loop.start(time.perf_counter())
+            self.timer.start(self.loop.timerInterval(), Qt.TimerType.PreciseTimer, self)  # Запускаем таймер
+
+    def restore(self):
+        """Продолжает партию из снимка (на паузе); возвращает False, если снимка нет."""
+        try:
+            elapsed = snapshot.load(self.snapshotPath, self.engine)
+        except (ValueError, KeyError, struct.error):  # Поврежденный или чужой снимок
+            elapsed = None
+            self.engine.isStarted = False
+
+        if elapsed is None or not self.engine.isStarted:
+            self.parent_tetris.snapshots.remove(self.snapshotPath)
+            return False
+
+        if self.engine.isWaitingAfterLine:  # Фигура была зафиксирована: сразу выдаем следующую
+            self.engine.step()
+
+        self.gameStartedAt = time.monotonic() - elapsed
+        self.gameRecorded = False
+        self.isPaused = True  # После перезапуска игрок продолжает сам
+        self.msg2Statusbar.emit(f"Партия восстановлена | Очки: {self.engine.current_score} | P - продолжить")
+        return True
+
+    def saveSnapshot(self):
+        """Сохраняет снимок незаконченной партии; возвращает True, если снимок поставлен на запись."""
+        if (not self.engine.isStarted or self.gameRecorded or self.parent_tetris.replay is not None
+                or self.parent_tetris.versus is not None):
+            return False
+
+        data = snapshot.toBytes(self.engine, time.monotonic() - self.gameStartedAt)
+        self.parent_tetris.snapshots.save(data, self.snapshotPath)  # fsync не задерживает игровой такт
+        self.snapshotAt = time.monotonic()
+        return True
+
+    def showScore(self):
+        """Показывает в строке состояния счет, уровень и рекорд."""
+        self.msg2Statusbar.emit(f"Очки: {self.engine.current_score} | Уровень: {self.engine.level()} | "
+                                f"Макс Очки: {self.parent_tetris.max_score}")
 
     def pause(self):
         """Ставит игру на паузу."""
-        if not self.isStarted:  # Если игра не начата, возвращаемся
+        if not self.engine.isStarted:  # Если игра не начата, возвращаемся
             return
 
         self.isPaused = not self.isPaused  # Переключаем состояние паузы
 
         if self.isPaused:
             self.timer.stop()  # Останавливаем таймер
+            self.loop.stop()
+            self.saveSnapshot()  # Игрок может не вернуться к паузе
             self.msg2Statusbar.emit("Игра на паузе")  # Отправляем сообщение о паузе
         else:
-            self.timer.start(Board.Speed, self)  # Возобновляем таймер
-            self.msg2Statusbar.emit(f"Очки: {self.current_score} | Макс Очки: {self.parent_tetris.max_score}")
+            self.loop.resume(time.perf_counter())  # Время паузы не догоняем
+            self.timer.start(self.loop.timerInterval(), Qt.TimerType.PreciseTimer, self)  # Возобновляем таймер
+            self.showScore()
 
         self.update()  # Обновляем виджет
 
     def paintEvent(self, event):
-        """Рисует все формы игры."""
+        """Рисует формы игры, попавшие в перерисовываемую область."""
         painter = QPainter(self)
-        rect = self.contentsRect()
-
-        boardTop = rect.bottom() - Board.BoardHeight * self.squareHeight()  # Определяем верхнюю границу доски
+        engine = self.engine
 
-        for i in range(Board.BoardHeight):
-            for j in range(Board.BoardWidth):
-                shape = self.shapeAt(j, Board.BoardHeight - i - 1)  # Получаем форму для рисования
-
-                if shape != Tetrominoe.NoShape:  # Если форма не пустая
-                    self.drawSquare(painter,
-                                    rect.left() + j * self.squareWidth(),
-                                    boardTop + i * self.squareHeight(), shape)  # Рисуем квадрат
+        if not self.ensureLayers():  # Окно слишком маленькое для доски
+            return
 
-        if self.curPiece.shape() != Tetrominoe.NoShape:  # Если текущая фигура не пустая
-            for i in range(4):
-                x = self.curX + self.curPiece.x(i)
-                y = self.curY - self.curPiece.y(i)
-                self.drawSquare(painter, rect.left() + x * self.squareWidth(),
-                                boardTop + (Board.BoardHeight - y - 1) * self.squareHeight(),
-                                self.curPiece.shape())
+        squareWidth, squareHeight = self.tileSize
+        boardLeft = self.contentsRect().left()
+        boardTop = self.boardTop()  # Определяем верхнюю границу доски
+
+        # Копируем из слоя стека только перерисовываемую область
+        dirty = event.rect().intersected(QRect(boardLeft, boardTop, self.boardWidth * squareWidth,
+                                               self.boardHeight * squareHeight))
+        if not dirty.isEmpty():
+            painter.drawPixmap(dirty, self.stackLayer, dirty.translated(-boardLeft, -boardTop))
+
+        if engine.curShape != Tetrominoe.NoShape:  # Если текущая фигура не пустая
+            ghostY = engine.dropRow()  # Тень показывает, куда упадет фигура
+            if ghostY != engine.curY:
+                tile = self.ghostTiles[engine.curShape]
+                for x, y in engine.pieceCells(ghostY):
+                    painter.drawPixmap(boardLeft + x * squareWidth,
+                                       boardTop + (self.boardHeight - y - 1) * squareHeight, tile)
+
+            tile = self.tiles[engine.curShape]
+            for x, y in engine.pieceCells():
+                painter.drawPixmap(boardLeft + x * squareWidth,
+                                   boardTop + (self.boardHeight - y - 1) * squareHeight, tile)
+
+    def boardTop(self):
+        """Возвращает верхнюю границу доски в координатах виджета."""
+        return self.contentsRect().bottom() - self.boardHeight * self.squareHeight()
+
+    def updateCells(self, bounds):
+        """Запрашивает перерисовку только прямоугольника изменившихся клеток и тени фигуры."""
+        engine = self.engine
+        ghost = None
+        if engine.curShape != Tetrominoe.NoShape:
+            ghost = engine.pieceBounds(engine.curRotation, engine.curX, engine.dropRow())
+
+        minX, minY, maxX, maxY = bounds
+        for other in (self.ghostBounds, ghost):  # Старая и новая тень
+            if other is not None:
+                minX, minY = min(minX, other[0]), min(minY, other[1])
+                maxX, maxY = max(maxX, other[2]), max(maxY, other[3])
+        self.ghostBounds = ghost
+
+        squareWidth = self.squareWidth()
+        squareHeight = self.squareHeight()
+
+        self.update(self.contentsRect().left() + minX * squareWidth,
+                    self.boardTop() + (self.boardHeight - maxY - 1) * squareHeight,
+                    (maxX - minX + 1) * squareWidth,
+                    (maxY - minY + 1) * squareHeight)
 
     def keyPressEvent(self, event):
         """Обрабатывает события нажатия клавиш."""
-        if not self.isStarted or self.curPiece.shape() == Tetrominoe.NoShape:  # Если игра не начата или фигура пустая
+        engine = self.engine
+
+        if not engine.isStarted or engine.curShape == Tetrominoe.NoShape:  # Если игра не начата или фигура пустая
             super(Board, self).keyPressEvent(event)  # Обрабатываем событие нажатия клавиши
             return
 
         key = event.key()  # Получаем нажатую клавишу
 
-        if key == Qt.Key.Key_P:  # Если нажата клавиша "P", ставим игру на паузу
-            self.pause()
+        if event.isAutoRepeat():  # Повтор удерживаемых клавиш делает игровой цикл
             return
 
-        if self.isPaused:  # Если игра на паузе, возвращаемся
+        if key == Qt.Key.Key_P:  # Если нажата клавиша "P", ставим игру на паузу
+            if self.parent_tetris.versus is None:  # Сетевой матч соперники не ждут
+                self.pause()
             return
 
-        elif key == Qt.Key.Key_Left.value:  # Если нажата клавиша влево
-            self.tryMove(self.curPiece, self.curX - 1, self.curY)  # Двигаем фигуру влево
-
-        elif key == Qt.Key.Key_Right.value:  # Если нажата клавиша вправо
-            self.tryMove(self.curPiece, self.curX + 1, self.curY)  # Двигаем фигуру вправо
-
-        elif key == Qt.Key.Key_Down.value:  # Если нажата клавиша вниз
-            self.tryMove(self.curPiece.rotateRight(), self.curX, self.curY)  # Поворачиваем фигуру вправо
+        if self.isPaused or self.parent_tetris.replay is not None:  # Если игра на паузе или идет повтор
+            return
 
-        elif key == Qt.Key.Key_Up.value:  # Если нажата клавиша вверх
-            self.tryMove(self.curPiece.rotateLeft(), self.curX, self.curY)  # Поворачиваем фигуру влево
+        elif key in Board.keyActions:  # Клавиши управления фигурой
+            self.loop.press(Board.keyActions[key])  # Двигаем, поворачиваем или роняем фигуру
 
-        elif key == Qt.Key.Key_Space.value:  # Если нажата клавиша пробела
-            self.dropDown()  # Уронить фигуру
+        elif key == Qt.Key.Key_R.value and self.parent_tetris.versus is None:  # Если нажата клавиша "R"
+            self.restartGame()  # Перезапускаем игру
 
-        elif key == Qt.Key.Key_D.value:  # Если нажата клавиша "D"
-            self.oneLineDown()  # Двигаем фигуру вниз на одну линию
+        elif key == Qt.Key.Key_B.value:  # Если нажата клавиша "B"
+            self.bot = None if self.bot else Bot()  # Включаем или выключаем бота
 
-        elif key == Qt.Key.Key_R.value:  # Если нажата клавиша "R"
-            self.restartGame()  # Перезапускаем игру
+        elif key == Qt.Key.Key_F3.value and self.overlay is not None:  # Если нажата клавиша "F3"
+            self.overlay.setVisible(not self.overlay.isVisible())  # Показываем или прячем оверлей
 
         else:
             super(Board, self).keyPressEvent(event)  # Обрабатываем остальные клавиши
 
+    def keyReleaseEvent(self, event):
+        """Отпускает удерживаемую клавишу управления."""
+        if not event.isAutoRepeat() and event.key() in Board.keyActions:
+            self.loop.release(Board.keyActions[event.key()])
+        else:
+            super(Board, self).keyReleaseEvent(event)
+
+    def focusOutEvent(self, event):
+        """Отпускает все клавиши, когда окно теряет фокус."""
+        self.loop.held.clear()
+        super(Board, self).focusOutEvent(event)
+
     def timerEvent(self, event):
         """Обрабатывает событие таймера."""
         if event.timerId() == self.timer.timerId():  # Если это наш таймер
-            if self.isWaitingAfterLine:  # Если ждем после удаления линии
-                self.isWaitingAfterLine = False
-                self.newPiece()  # Генерируем новую фигуру
-            else:
-                self.oneLineDown()  # Двигаем фигуру вниз
+            self.loop.advance(time.perf_counter())  # Выполняем такты за прошедшее время
+
+            if time.monotonic() - self.snapshotAt >= Board.SnapshotInterval:
+                self.saveSnapshot()  # Партия переживет отключение питания
         else:
             super(Board, self).timerEvent(event)  # Обрабатываем остальные события таймера
 
-    def clearBoard(self):
-        """Очищает формы с доски."""
-        self.board = [Tetrominoe.NoShape] * (Board.BoardHeight * Board.BoardWidth)  # Очищаем доску
-
-    def dropDown(self):
-        """Уроняет фигуру вниз."""
-        newY = self.curY
-
-        while newY > 0:  # Двигаем фигуру вниз, пока это возможно
-            if not self.tryMove(self.curPiece, self.curX, newY - 1):  # Если не можем двигаться
-                break
-            newY -= 1
-
-        self.pieceDropped()  # Фигура упала
-
-    def oneLineDown(self):
-        """Двигает фигуру вниз на одну линию."""
-        if not self.tryMove(self.curPiece, self.curX, self.curY - 1):  # Если не можем двигаться вниз
-            self.pieceDropped()  # Фигура упала
-
-    def pieceDropped(self):
-        """После падения фигуры, удаляет полные линии и создает новую фигуру."""
-        for i in range(4):
-            x = self.curX + self.curPiece.x(i)
-            y = self.curY - self.curPiece.y(i)
-            self.setShapeAt(x, y, self.curPiece.shape())  # Устанавливаем фигуру на доску
-
-        self.removeFullLines()  # Проверяем и удаляем полные линии
-
-        if not self.isWaitingAfterLine:  # Если не ждем после удаления линии
-            self.newPiece()  # Генерируем новую фигуру
-
-    def removeFullLines(self):
-        """Удаляет все полные линии с доски."""
-        numFullLines = 0
-        rowsToRemove = []  # Список полных линий
-
-        for i in range(Board.BoardHeight):
-            n = 0
-            for j in range(Board.BoardWidth):
-                if not self.shapeAt(j, i) == Tetrominoe.NoShape:  # Если ячейка не пустая
-                    n += 1
+    def gravityStep(self):
+        """Шаг гравитации игрового цикла."""
+        if self.parent_tetris.replay is not None:
+            self.replayTick()  # Воспроизводим записанные действия
+        elif self.bot is not None and self.engine.curShape != Tetrominoe.NoShape:
+            self.bot.play(self.engine)  # Бот ставит фигуру за один шаг
+        else:
+            self.engine.step()  # Опускаем фигуру
+
+    def replayTick(self):
+        """Выполняет действия повтора, записанные до текущего такта, и сам такт."""
+        engine = self.engine
+        replay = self.parent_tetris.replay
+        events = replay.events
+
+        while self.replayPos < len(events) and events[self.replayPos][0] <= engine.ticks:
+            engine.apply(events[self.replayPos][1])
+            self.replayPos += 1
+
+        if self.replayPos == len(events) and engine.ticks >= replay.ticks:  # Запись закончилась
+            self.timer.stop()
+            self.loop.stop()
+            self.msg2Statusbar.emit(f"Повтор окончен | Очки: {engine.current_score}")
+            return
 
-            if n == 10:  # Если линия полная
-                rowsToRemove.append(i)  # Добавляем в список полных линий
+        engine.step()
 
-        rowsToRemove.reverse()  # Переворачиваем список для удаления
+    def refreshOverlay(self):
+        """Показывает текущие процентили профилировщика в оверлее."""
+        if self.overlay.isVisible():
+            self.overlay.setText(self.parent_tetris.profiler.overlayText())
+            self.overlay.adjustSize()
 
-        for m in rowsToRemove:
-            for k in range(m, Board.BoardHeight):
-                for l in range(Board.BoardWidth):
-                    self.setShapeAt(l, k, self.shapeAt(l, k + 1))  # Сдвигаем линии вниз
+    def linesRemoved(self, numFullLines):
+        """Обновляет счет после удаления линий."""
+        score = self.engine.current_score
+        self.showScore()
 
-        numFullLines = len(rowsToRemove)  # Считаем количество полных линий
+        # Обновляем максимальные очки, если текущие больше
+        if score > self.parent_tetris.max_score:
+            self.parent_tetris.max_score = score
 
-        if numFullLines > 0:  # Если есть полные линии
-            self.numLinesRemoved += numFullLines
-            self.current_score += numFullLines * 100  # Добавляем очки за полные линии
-            self.msg2Statusbar.emit(f"Очки: {self.current_score} | Макс Очки: {self.parent_tetris.max_score}")
+        if self.parent_tetris.versus is not None:
+            self.parent_tetris.versus.linesCleared(numFullLines)  # Атакуем соперников
 
-            # Обновляем максимальные очки, если текущие больше
-            if self.current_score > self.parent_tetris.max_score:
-                self.parent_tetris.max_score = self.current_score
+    def gameOver(self):
+        """Останавливает игру, когда новую фигуру некуда поставить."""
+        self.timer.stop()  # Останавливаем таймер
+        self.loop.stop()
 
-            # Вставляем текущие очки в базу данных
-            self.parent_tetris.db.insert_score(self.current_score)
+        if self.parent_tetris.replay is not None:  # Повтор просто заканчивается
+            self.msg2Statusbar.emit(f"Повтор окончен | Очки: {self.engine.current_score}")
+            return
 
-        self.isWaitingAfterLine = True  # Устанавливаем флаг ожидания
-        self.curPiece.setShape(Tetrominoe.NoShape)  # Убираем текущую фигуру
-        self.update()  # Обновляем виджет
+        self.recordGame()  # Сохраняем результат партии
+        self.parent_tetris.db.flush(wait=False)  # Записываем его на диск, не блокируя игру
+        self.msg2Statusbar.emit("Игра окончена")  # Отправляем сообщение о конце игры
 
-    def newPiece(self):
-        """Создает новую фигуру."""
-        self.curPiece = Shape()  # Создаем новую фигуру
-        self.curPiece.setRandomShape()  # Устанавливаем случайную фигуру
-        self.curX = Board.BoardWidth // 2 + 1  # Устанавливаем позицию X
-        self.curY = Board.BoardHeight - 1 + self.curPiece.minY()  # Устанавливаем позицию Y
+        if self.parent_tetris.versus is not None:  # В матче перезапуска нет
+            self.parent_tetris.versus.gameOver()
+            self.msg2Statusbar.emit(f"Вы выбыли | Очки: {self.engine.current_score}")
+            return
 
-        if not self.tryMove(self.curPiece, self.curX, self.curY):  # Если не можем установить фигуру
-            self.curPiece.setShape(Tetrominoe.NoShape)  # Убираем фигуру
-            self.timer.stop()  # Останавливаем таймер
-            self.isStarted = False  # Игра закончена
-            self.msg2Statusbar.emit("Игра окончена")  # Отправляем сообщение о конце игры
+        # Запрашиваем перезапуск игры
+        self.restartGame()
 
-            # Запрашиваем перезапуск игры
-            self.restartGame()
+    def matchOver(self, message):
+        """Останавливает игру по окончании сетевого матча."""
+        self.timer.stop()
+        self.loop.stop()
+        self.recordGame()
+        self.msg2Statusbar.emit(message)
 
     def restartGame(self):
         """Запрашивает у пользователя перезапуск игры."""
+        self.recordGame()  # Прерванная партия тоже попадает в таблицу рекордов
+
         reply = QMessageBox.question(self, 'Игра окончена',
                                      "Хотите перезапустить игру?",  # Запрос на перезапуск
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
@@ -352,171 +497,139 @@ class Board(QFrame):
         if reply == QMessageBox.StandardButton.Yes:
             self.start()  # Перезапускаем игру
         else:
-            QApplication.quit()  # Выходим из приложения
-
-    def tryMove(self, newPiece, newX, newY):
-        """Пытается переместить фигуру."""
-        for i in range(4):
-            x = newX + newPiece.x(i)
-            y = newY - newPiece.y(i)
-
-            if x < 0 or x >= Board.BoardWidth or y < 0 or y >= Board.BoardHeight:  # Проверяем границы
-                return False
+            self.parent_tetris.close()  # Закрываем окно, сохраняя базу данных, и выходим
+
+    def recordGame(self):
+        """Сохраняет результат текущей партии в базу данных и ее повтор (один раз за партию)."""
+        if self.gameRecorded or self.engine.numPieces == 0 or self.parent_tetris.replay is not None:
+            return  # Сохранять нечего
+
+        self.gameRecorded = True
+        self.parent_tetris.db.insert_game(self.engine.current_score, self.engine.numLinesRemoved,
+                                          time.monotonic() - self.gameStartedAt, self.parent_tetris.player)
+        if self.parent_tetris.versus is None:
+            self.parent_tetris.snapshots.remove(self.snapshotPath)  # Записанную партию продолжать нельзя, иначе она попадет в базу дважды
+
+        if self.recorder is not None:  # Сохраняем повтор партии
+            replay = self.recorder.finish()
+            self.recorder = None
+            os.makedirs(self.parent_tetris.recordDir, exist_ok=True)
+            replay.save(os.path.join(self.parent_tetris.recordDir,
+                                     f"{datetime.now():%Y%m%d-%H%M%S}-{replay.seed}.trp"))
+
+    def ensureLayers(self):
+        """Перестраивает плитки и слой стека, если изменился размер клетки."""
+        size = (self.squareWidth(), self.squareHeight())
+
+        if size[0] <= 0 or size[1] <= 0:  # Рисовать некуда
+            return False
+
+        if size != self.tileSize:  # Размер изменился: рисуем все заново
+            self.tileSize = size
+            shapes = range(1, len(Board.colorTable))  # Формы фигур и мусорные клетки
+            self.tiles = [None] + [self.renderTile(shape, *size) for shape in shapes]
+            self.ghostTiles = [None] + [self.renderGhostTile(shape, *size) for shape in shapes]
+            self.stackLayer = QPixmap(self.boardWidth * size[0], self.boardHeight * size[1])
+            self.stackLayer.fill(Qt.GlobalColor.transparent)  # Слой с прозрачным фоном
+            self.renderStack(0, self.boardHeight - 1)
+
+        return True
+
+    def stackChanged(self, bounds):
+        """Перерисовывает в слое стека строки, затронутые фиксацией фигуры или удалением линий."""
+        if self.stackLayer is not None and self.ensureLayers():
+            self.renderStack(bounds[1], bounds[3])
+
+    def renderStack(self, minY, maxY):
+        """Рисует строки доски с minY по maxY в слой стека."""
+        squareWidth, squareHeight = self.tileSize
+        painter = QPainter(self.stackLayer)
+
+        # Стираем строки до прозрачности и рисуем их клетки заново
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        painter.fillRect(0, (self.boardHeight - maxY - 1) * squareHeight,
+                         self.boardWidth * squareWidth, (maxY - minY + 1) * squareHeight,
+                         Qt.GlobalColor.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+
+        for y in range(minY, maxY + 1):
+            top = (self.boardHeight - y - 1) * squareHeight
+            for x in range(self.boardWidth):
+                shape = self.engine.shapeAt(x, y)
+
+                if shape != Tetrominoe.NoShape:  # Если клетка занята
+                    painter.drawPixmap(x * squareWidth, top, self.tiles[shape])
+
+        painter.end()
+
+    @staticmethod
+    def renderTile(shape, width, height):
+        """Рисует клетку формы заданного размера в отдельную картинку."""
+        tile = QPixmap(width, height)
+        tile.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(tile)
+
+        color = QColor(Board.colorTable[shape])  # Получаем цвет фигуры
+        painter.fillRect(1, 1, width - 2, height - 2, color)  # Рисуем квадрат
 
-            if self.shapeAt(x, y) != Tetrominoe.NoShape:  # Проверяем на занятые ячейки
-                return False
+        painter.setPen(color.lighter())  # Устанавливаем цвет для линий
+        painter.drawLine(0, height - 1, 0, 0)  # Рисуем линии
 
-        self.curPiece = newPiece  # Устанавливаем новую фигуру
-        self.curX = newX  # Обновляем позицию X
-        self.curY = newY  # Обновляем позицию Y
-        self.update()  # Обновляем виджет
+        painter.setPen(color.darker())  # Устанавливаем цвет для темных линий
+        painter.drawLine(1, height - 1, width - 1, height - 1)
+        painter.drawLine(width - 1, height - 1, width - 1, 1)
 
-        return True  # Успешное движение
+        painter.end()
+        return tile
 
-    def drawSquare(self, painter, x, y, shape):
-        """Рисует квадрат фигуры."""
-        colorTable = [0x000000, 0xCC6666, 0x66CC66, 0x6666CC,
-                      0xCCCC66, 0xCC66CC, 0x66CCCC, 0xDAAA00]
+    def renderGhostTile(self, shape, width, height):
+        """Рисует клетку тени формы: полупрозрачную заливку с рамкой цвета формы."""
+        tile = QPixmap(width, height)
+        tile.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(tile)
 
-        color = QColor(colorTable[shape])  # Получаем цвет фигуры
-        painter.fillRect(x + 1, y + 1, self.squareWidth() - 2,
-                         self.squareHeight() - 2, color)  # Рисуем квадрат
+        color = QColor(Board.colorTable[shape])
+        painter.setPen(color)
+        color.setAlpha(60)
+        painter.fillRect(1, 1, width - 2, height - 2, color)
+        painter.drawRect(0, 0, width - 1, height - 1)
 
-        painter.setPen(color.lighter())  # Устанавливаем цвет для линий
-        painter.drawLine(x, y + self.squareHeight() - 1, x, y)  # Рисуем линии
-
-        painter.setPen(color.darker())  # Устанавливаем цвет для темных линий
-        painter.drawLine(x + 1, y + self.squareHeight() - 1,
-                         x + self.squareWidth() - 1, y + self.squareHeight() - 1)
-        painter.drawLine(x + self.squareWidth() - 1,
-                         y + self.squareHeight() - 1, x + self.squareWidth() - 1, y + 1)
-
-
-class Tetrominoe:
-    NoShape = 0
-    ZShape = 1
-    SShape = 2
-    LineShape = 3
-    TShape = 4
-    SquareShape = 5
-    LShape = 6
-    MirroredLShape = 7
-
-
-class Shape:
-    coordsTable = (
-        ((0, 0), (0, 0), (0, 0), (0, 0)),
-        ((0, -1), (0, 0), (-1, 0), (-1, 1)),
-        ((0, -1), (0, 0), (1, 0), (1, 1)),
-        ((0, -1), (0, 0), (0, 1), (0, 2)),
-        ((-1, 0), (0, 0), (1, 0), (0, 1)),
-        ((0, 0), (1, 0), (0, 1), (1, 1)),
-        ((-1, -1), (0, -1), (0, 0), (0, 1)),
-        ((1, -1), (0, -1), (0, 0), (0, 1))
-    )
-
-    def __init__(self):
-        self.coords = [[0, 0] for _ in range(4)]  # Координаты фигуры
-        self.pieceShape = Tetrominoe.NoShape  # Форма фигуры
-        self.setShape(Tetrominoe.NoShape)  # Устанавливаем форму
-
-    def shape(self):
-        """Возвращает форму."""
-        return self.pieceShape
-
-    def setShape(self, shape):
-        """Устанавливает форму."""
-        table = Shape.coordsTable[shape]  # Получаем таблицу координат для фигуры
-
-        for i in range(4):
-            for j in range(2):
-                self.coords[i][j] = table[i][j]  # Устанавливаем координаты
-
-        self.pieceShape = shape  # Устанавливаем форму
-
-    def setRandomShape(self):
-        """Выбирает случайную форму."""
-        self.setShape(random.randint(1, 7))
-
-    def x(self, index):
-        """Возвращает координату x."""
-        return self.coords[index][0]
-
-    def y(self, index):
-        """Возвращает координату y."""
-        return self.coords[index][1]
-
-    def setX(self, index, x):
-        """Устанавливает координату x."""
-        self.coords[index][0] = x
-
-    def setY(self, index, y):
-        """Устанавливает координату y."""
-        self.coords[index][1] = y
-
-    def minX(self):
-        """Возвращает минимальное значение x."""
-        m = self.coords[0][0]
-        for i in range(4):
-            m = min(m, self.coords[i][0])  # Находим минимальную координату x
-        return m
-
-    def maxX(self):
-        """Возвращает максимальное значение x."""
-        m = self.coords[0][0]
-        for i in range(4):
-            m = max(m, self.coords[i][0])  # Находим максимальную координату x
-        return m
-
-    def minY(self):
-        """Возвращает минимальное значение y."""
-        m = self.coords[0][1]
-        for i in range(4):
-            m = min(m, self.coords[i][1])  # Находим минимальную координату y
-        return m
-
-    def maxY(self):
-        """Возвращает максимальное значение y."""
-        m = self.coords[0][1]
-        for i in range(4):
-            m = max(m, self.coords[i][1])  # Находим максимальную координату y
-        return m
-
-    def rotateLeft(self):
-        """Поворачивает фигуру влево."""
-        if self.pieceShape == Tetrominoe.SquareShape:
-            return self  # Если фигура квадрат, не поворачиваем
-
-        result = Shape()  # Создаем новую фигуру
-        result.pieceShape = self.pieceShape  # Устанавливаем форму
-
-        for i in range(4):
-            result.setX(i, self.y(i))  # Поворачиваем фигуру влево
-            result.setY(i, -self.x(i))
-
-        return result
-
-    def rotateRight(self):
-        """Поворачивает фигуру вправо."""
-        if self.pieceShape == Tetrominoe.SquareShape:
-            return self  # Если фигура квадрат, не поворачиваем
-
-        result = Shape()  # Создаем новую фигуру
-        result.pieceShape = self.pieceShape  # Устанавливаем форму
-
-        for i in range(4):
-            result.setX(i, -self.y(i))  # Поворачиваем фигуру вправо
-            result.setY(i, self.x(i))
-
-        return result
+        painter.end()
+        return tile
 
 
 def main():
-    app = QApplication([])  # Создаем приложение
-
-    tetris = Tetris()  # Создаем экземпляр Tetris
+    parser = argparse.ArgumentParser(description='Тетрис')
+    parser.add_argument('--record', metavar='DIR', help='записывать повторы партий в каталог')
+    parser.add_argument('--replay', metavar='FILE', help='показать записанный повтор')
+    parser.add_argument('--tick-rate', type=int, default=GameLoop.TickRate,
+                        help='частота игрового цикла, тактов в секунду')
+    parser.add_argument('--rules', choices=sorted(rulesets), default='classic', help='набор правил: очки и гравитация')
+    parser.add_argument('--size', metavar='WxH', help='размер доски, например 20x40 (по умолчанию - из правил)')
+    parser.add_argument('--connect', metavar='HOST:PORT', help='играть сетевой матч через сервер net.py')
+    parser.add_argument('--name', default=getpass.getuser(), help='имя игрока в сетевом матче')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='замерять горячие участки (F3 - оверлей) и сохранить отчет в JSON при выходе')
+    args, qtArgs = parser.parse_known_args()  # Остальные аргументы достаются Qt
+
+    app = QApplication(sys.argv[:1] + qtArgs)  # Создаем приложение
+
+    try:
+        replay = Replay.load(args.replay) if args.replay else None
+    except (OSError, ValueError) as error:
+        parser.error(f"--replay: {error}")
+    try:
+        rules = makeRules(args.rules, args.size)
+    except ValueError as error:
+        parser.error(f"--size: {error}")
+    versus = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(':')
+        versus = Versus(host or '127.0.0.1', int(port), args.name, rules)
+
+    tetris = Tetris(args.record, replay, args.profile, args.tick_rate, versus, rules)  # Создаем экземпляр Tetris
     sys.exit(app.exec())  # Запускаем приложение
 
 
 if __name__ == '__main__':
-    main()  # Запускаем основную функцию
\ No newline at end of file
+    main()  # Запускаем основную функцию
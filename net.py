@@ -0,0 +1,252 @@
+"""Сетевая игра нескольких игроков: двоичный протокол и сервер на asyncio.
+
+Каждый клиент играет на своем движке, а сервер только пересылает
+сообщения. Все игроки получают одно зерно, поэтому у них одинаковая
+последовательность фигур, и по потоку шагов, действий и мусорных линий
+соперника клиент воспроизводит его доску на своем движке-тени. Для
+этого у всех игроков должны быть одни правила: их называет Hello,
+правила матча задает первый игрок, а остальных с другими правилами
+сервер отклоняет.
+
+Сообщение - заголовок (тип, игрок) по байту и тело фиксированного для
+типа размера; имена передаются как длина (1 байт) и UTF-8, после
+имени в Hello идут имя правил так же и ширина с высотой доски (по 2 байта).
+
+Запуск сервера: python net.py --players 2 --host 127.0.0.1 --port 7777
+"""
+import argparse
+import asyncio
+import random
+import struct
+
+GarbageTable = (0, 0, 1, 2, 4)  # Сколько мусорных линий отправляет удаление 0-4 линий
+NoPlayer = 255  # Номер игрока, когда победителя нет
+
+
+class Message:
+    Hello = 1  # Клиент -> сервер: имя игрока, имя правил, ширина и высота доски
+    Join = 2  # Сервер -> клиент: игрок присоединился (имя)
+    Start = 3  # Сервер -> клиент: начало матча (число игроков, зерно); игрок - номер получателя
+    Step = 4  # Шаг гравитации игрока
+    Action = 5  # Действие игрока (Action)
+    Garbage = 6  # Игрок получил мусорные линии (число, столбец дыры)
+    Attack = 7  # Клиент -> сервер: атака (число линий); сервер -> клиент: атака от игрока
+    GameOver = 8  # Игрок выбыл
+    Winner = 9  # Сервер -> клиент: матч окончен, игрок - победитель
+    Reject = 10  # Сервер -> клиент: подключение отклонено (причина)
+
+
+Header = struct.Struct('<BB')  # Тип сообщения и номер игрока
+Bodies = {
+    Message.Start: struct.Struct('<BI'),
+    Message.Step: struct.Struct(''),
+    Message.Action: struct.Struct('<B'),
+    Message.Garbage: struct.Struct('<BB'),
+    Message.Attack: struct.Struct('<B'),
+    Message.GameOver: struct.Struct(''),
+    Message.Winner: struct.Struct(''),
+}  # Тела сообщений фиксированного размера
+Named = (Message.Hello, Message.Join, Message.Reject)  # Сообщения с именем в теле
+BoardSize = struct.Struct('<HH')  # Ширина и высота доски в Hello
+
+
+def encodeText(text):
+    """Кодирует строку как длину (1 байт) и UTF-8."""
+    data = text.encode('utf-8')[:255]
+    return bytes((len(data),)) + data
+
+
+async def readText(reader):
+    """Читает строку, закодированную encodeText."""
+    length = (await reader.readexactly(1))[0]
+    return (await reader.readexactly(length)).decode('utf-8', 'replace')
+
+
+def encode(kind, player, *fields):
+    """Кодирует сообщение в байты."""
+    if kind == Message.Hello:
+        name, rules, width, height = fields
+        return Header.pack(kind, player) + encodeText(name) + encodeText(rules) + BoardSize.pack(width, height)
+
+    if kind in Named:
+        return Header.pack(kind, player) + encodeText(fields[0])
+
+    return Header.pack(kind, player) + Bodies[kind].pack(*fields)
+
+
+async def readMessage(reader):
+    """Читает одно сообщение из потока: (тип, игрок, поля)."""
+    kind, player = Header.unpack(await reader.readexactly(Header.size))
+
+    if kind == Message.Hello:
+        name = await readText(reader)
+        rules = await readText(reader)
+        return kind, player, (name, rules) + BoardSize.unpack(await reader.readexactly(BoardSize.size))
+
+    if kind in Named:
+        return kind, player, (await readText(reader),)
+
+    if kind not in Bodies:
+        raise ValueError(f"Неизвестное сообщение: {kind}")
+
+    body = Bodies[kind]
+    return kind, player, body.unpack(await reader.readexactly(body.size)) if body.size else ()
+
+
+class Server:
+    """Сервер матча: собирает игроков, раздает зерно и пересылает сообщения.
+
+    Правила матча (имя и размер доски) задает первый подключившийся
+    игрок; игроку с другими правилами сервер отвечает Reject.
+    Атаки отправляются выжившим соперникам по кругу. Когда остается один
+    игрок (или ни одного), всем рассылается Winner; после отключения всех
+    игроков сервер ждет следующий матч.
+    """
+
+    def __init__(self, players=2, seed=None):
+        self.players = players  # Сколько игроков нужно для начала матча
+        self.seed = seed  # Зерно матча (None - случайное)
+        self.reset()
+
+    def reset(self):
+        """Готовит сервер к новому матчу."""
+        self.writers = {}  # Потоки записи игроков по номеру
+        self.names = {}  # Имена игроков по номеру
+        self.alive = set()  # Номера игроков, еще не выбывших
+        self.targets = {}  # Счетчик атак каждого игрока для выбора цели по кругу
+        self.rules = None  # Правила матча: (имя, ширина, высота)
+        self.started = False  # Матч идет
+
+    def send(self, player, data):
+        """Отправляет данные одному игроку."""
+        writer = self.writers.get(player)
+        if writer is not None and not writer.is_closing():
+            writer.write(data)
+
+    def broadcast(self, data, exclude=None):
+        """Отправляет данные всем игрокам, кроме exclude."""
+        for player in list(self.writers):
+            if player != exclude:
+                self.send(player, data)
+
+    async def handle(self, reader, writer):
+        """Обслуживает соединение одного игрока."""
+        player = None
+        try:
+            kind, _, fields = await readMessage(reader)
+            if kind != Message.Hello:
+                return  # Это не клиент
+
+            reason = None
+            if self.started or len(self.writers) >= self.players:
+                reason = "матч уже идет"
+            elif self.rules is not None and tuple(fields[1:]) != self.rules:
+                name, width, height = self.rules
+                reason = f"в матче правила {name} {width}x{height}"
+            if reason is not None:
+                writer.write(encode(Message.Reject, NoPlayer, reason))
+                await writer.drain()
+                return
+
+            self.rules = tuple(fields[1:])
+
+            player = min(set(range(self.players)) - set(self.writers))
+            for other, name in self.names.items():  # Новичку - уже подключившихся
+                writer.write(encode(Message.Join, other, name))
+
+            self.writers[player] = writer
+            self.names[player] = fields[0]
+            self.broadcast(encode(Message.Join, player, fields[0]), exclude=player)
+
+            if len(self.writers) == self.players:
+                self.start()
+
+            while True:
+                kind, _, fields = await readMessage(reader)
+                self.dispatch(player, kind, fields)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+            if player is not None:
+                self.leave(player)
+
+    def start(self):
+        """Начинает матч: все получают одно зерно и свой номер."""
+        seed = self.seed if self.seed is not None else random.randrange(2 ** 32)
+        self.started = True
+        self.alive = set(self.writers)
+        self.targets = {player: 0 for player in self.writers}
+
+        for player in self.writers:
+            self.send(player, encode(Message.Start, player, self.players, seed))
+
+    def dispatch(self, player, kind, fields):
+        """Обрабатывает сообщение игрока."""
+        if not self.started:
+            return
+
+        if kind == Message.Attack:
+            self.attack(player, fields[0])
+        elif kind == Message.GameOver:
+            self.broadcast(encode(Message.GameOver, player), exclude=player)
+            self.eliminate(player)
+        elif kind in (Message.Step, Message.Action, Message.Garbage):
+            self.broadcast(encode(kind, player, *fields), exclude=player)  # Соперники повторяют ход на тенях
+
+    def attack(self, player, lines):
+        """Отправляет мусорные линии следующему по кругу выжившему сопернику."""
+        targets = sorted(self.alive - {player})
+        if not targets or player not in self.alive:
+            return
+
+        target = targets[self.targets[player] % len(targets)]
+        self.targets[player] += 1
+        self.send(target, encode(Message.Attack, player, lines))
+
+    def eliminate(self, player):
+        """Отмечает выбывание игрока и объявляет победителя, если остался один."""
+        if player not in self.alive:
+            return
+
+        self.alive.discard(player)
+        if len(self.alive) <= 1:
+            winner = next(iter(self.alive), NoPlayer)
+            self.broadcast(encode(Message.Winner, winner))
+
+    def leave(self, player):
+        """Убирает отключившегося игрока."""
+        self.writers.pop(player, None)
+        self.names.pop(player, None)
+
+        if self.started:
+            self.broadcast(encode(Message.GameOver, player))
+            self.eliminate(player)
+
+        if not self.writers:
+            self.reset()
+
+    async def serve(self, host, port):
+        """Принимает соединения до остановки."""
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сервер сетевой игры в тетрис.')
+    parser.add_argument('--host', default='127.0.0.1', help='адрес для подключений')
+    parser.add_argument('--port', type=int, default=7777, help='порт')
+    parser.add_argument('--players', type=int, default=2, help='игроков в матче')
+    parser.add_argument('--seed', type=int, help='зерно матча (по умолчанию случайное)')
+    args = parser.parse_args()
+
+    print(f"Сервер {args.host}:{args.port}, ждем игроков: {args.players}")
+    try:
+        asyncio.run(Server(args.players, args.seed).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
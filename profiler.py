@@ -0,0 +1,109 @@
+"""Замер времени горячих участков игры с процентилями по скользящему окну.
+
+Профилировщик включается только по запросу (python main.py --profile
+profile.json): он подменяет методы конкретных объектов обертками с
+замером времени, поэтому без него игра не платит ничего. Каждый участок
+хранит длительности последних Window вызовов; процентили считаются
+только при показе или выгрузке.
+"""
+import collections
+import json
+import time
+
+
+class Histogram:
+    """Длительности последних вызовов одного участка."""
+
+    Window = 2048  # Сколько последних замеров учитывается в процентилях
+
+    def __init__(self):
+        self.samples = collections.deque(maxlen=Histogram.Window)  # Последние длительности, секунды
+        self.count = 0  # Сколько замеров сделано всего
+        self.total = 0.0  # Суммарное время всех замеров, секунды
+
+    def add(self, seconds):
+        """Добавляет замер."""
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentiles(self, *ps):
+        """Возвращает процентили окна (в секундах) для каждого p из ps."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return tuple(0.0 for _ in ps)
+
+        last = len(ordered) - 1
+        return tuple(ordered[min(last, int(p / 100 * len(ordered)))] for p in ps)
+
+    def summary(self):
+        """Возвращает сводку в миллисекундах."""
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        return {
+            'count': self.count,
+            'mean': 1000 * self.total / self.count if self.count else 0.0,
+            'p50': 1000 * p50,
+            'p95': 1000 * p95,
+            'p99': 1000 * p99,
+            'max': 1000 * max(self.samples, default=0.0),
+        }
+
+
+class Profiler:
+    """Набор гистограмм по именам участков."""
+
+    def __init__(self):
+        self.histograms = {}  # Гистограммы по имени участка
+        self.startedAt = time.perf_counter()  # Время начала профилирования
+
+    def histogram(self, name):
+        """Возвращает гистограмму участка, создавая ее при первом обращении."""
+        if name not in self.histograms:
+            self.histograms[name] = Histogram()
+        return self.histograms[name]
+
+    def record(self, name, seconds):
+        """Добавляет замер участка name."""
+        self.histogram(name).add(seconds)
+
+    def timed(self, name, function):
+        """Возвращает обертку над function, замеряющую каждый вызов."""
+        add = self.histogram(name).add
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            started = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                add(clock() - started)
+
+        return wrapper
+
+    def instrument(self, obj, names, prefix=''):
+        """Подменяет методы names объекта obj обертками с замером времени."""
+        for name in names:
+            setattr(obj, name, self.timed(prefix + name, getattr(obj, name)))
+
+    def summary(self):
+        """Возвращает сводку всех участков в миллисекундах."""
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def overlayText(self):
+        """Возвращает строки для оверлея: участок, p50/p95/p99 в миллисекундах."""
+        lines = []
+        for name, stats in self.summary().items():
+            if stats['count']:
+                lines.append(f"{name:<22} {stats['p50']:6.2f} {stats['p95']:6.2f} {stats['p99']:6.2f}")
+
+        return "\n".join([f"{'мс':<22} {'p50':>6} {'p95':>6} {'p99':>6}"] + lines)
+
+    def export(self, path):
+        """Сохраняет сводку в JSON."""
+        report = {
+            'elapsed': time.perf_counter() - self.startedAt,
+            'window': Histogram.Window,
+            'sections': self.summary(),
+        }
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,223 @@
+"""Запись партий в компактные повторы и их воспроизведение без Qt.
+
+Повтор хранит только зерно генератора фигур и поток действий игрока с
+номерами тактов, поэтому весит несколько килобайт. Формат файла:
+
+    b'TTRP', версия (1 байт), длина имени генератора (1 байт), имя,
+    зерно (8 байт, little-endian), длина имени правил (1 байт), имя,
+    ширина и высота доски (по 2 байта), затем события varint((дельта тактов << 3) | действие),
+    где действие 0 завершает поток, и после него varint(очки), varint(линии).
+
+Запуск: python replay.py повтор.trp [повтор2.trp ...] - проигрывает повторы
+с максимальной скоростью и сверяет итог с записанным.
+
+Повторы версии 1 (без правил) проигрываются по классическим правилам,
+в версии 2 размер доски занимал по байту.
+"""
+import struct
+import sys
+import time
+
+from engine import Action, Engine, rulesets
+from generator import generators
+
+Magic = b'TTRP'  # Сигнатура файла повтора
+Version = 3  # Версия формата
+
+
+def writeVarint(out, value):
+    """Дописывает неотрицательное число в формате varint."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def readVarint(data, pos):
+    """Читает varint и возвращает (число, новая позиция)."""
+    value = 0
+    shift = 0
+
+    while True:
+        if pos >= len(data):
+            raise ValueError("Повтор обрезан")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """Записанная партия: генератор, зерно, правила, события (такт, действие) и итог."""
+
+    def __init__(self, generator, seed, events=None, ticks=0, score=0, lines=0, rules=None):
+        self.generator = generator  # Имя стратегии генератора фигур
+        self.seed = seed  # Зерно генератора фигур
+        self.rules = rules if rules is not None else rulesets['classic']  # Правила партии
+        self.events = events if events is not None else []  # Пары (такт, действие)
+        self.ticks = ticks  # Такт окончания записи
+        self.score = score  # Очки в конце записи
+        self.lines = lines  # Удаленные линии в конце записи
+
+    def toBytes(self):
+        """Кодирует повтор в двоичный формат."""
+        name = self.generator.encode('ascii')
+        out = bytearray(Magic)
+        out += struct.pack('<BB', Version, len(name)) + name + struct.pack('<Q', self.seed)
+        rules = self.rules.name.encode('ascii')
+        out += bytes((len(rules),)) + rules + struct.pack('<HH', self.rules.width, self.rules.height)
+
+        previous = 0
+        for tick, action in self.events:
+            writeVarint(out, ((tick - previous) << 3) | action)
+            previous = tick
+
+        writeVarint(out, (self.ticks - previous) << 3)  # Действие 0: конец потока
+        writeVarint(out, self.score)
+        writeVarint(out, self.lines)
+        return bytes(out)
+
+    @staticmethod
+    def fromBytes(data):
+        """Декодирует повтор из двоичного формата; обрезанный или испорченный повтор - ValueError."""
+        if len(data) < 6 or data[:4] != Magic:
+            raise ValueError("Файл не является повтором")
+
+        version, length = struct.unpack_from('<BB', data, 4)
+        if version not in (1, 2, Version):
+            raise ValueError(f"Неподдерживаемая версия повтора: {version}")
+
+        pos = 6 + length
+        generator = data[6:pos].decode('ascii')
+        if generator not in generators:
+            raise ValueError(f"Неизвестный генератор фигур: {generator}")
+        if len(data) < pos + 8:
+            raise ValueError("Повтор обрезан")
+        seed, = struct.unpack_from('<Q', data, pos)
+        pos += 8
+
+        rules = rulesets['classic']
+        if version >= 2:
+            if len(data) <= pos:
+                raise ValueError("Повтор обрезан")
+            length = data[pos]
+            name = data[pos + 1:pos + 1 + length].decode('ascii')
+            size = struct.Struct('<BB' if version == 2 else '<HH')  # Ширина и высота доски
+            if len(data) < pos + 1 + length + size.size:
+                raise ValueError("Повтор обрезан")
+            width, height = size.unpack_from(data, pos + 1 + length)
+            pos += 1 + length + size.size
+            if name not in rulesets:
+                raise ValueError(f"Неизвестные правила: {name}")
+            rules = rulesets[name]
+            if (width, height) != (rules.width, rules.height):
+                rules = rules.resized(width, height)
+
+        events = []
+        tick = 0
+        while True:
+            value, pos = readVarint(data, pos)
+            tick += value >> 3
+            action = value & 7
+            if action == 0:
+                break
+            if action > Action.OneLineDown:
+                raise ValueError(f"Повтор поврежден: неизвестное действие {action}")
+            events.append((tick, action))
+
+        score, pos = readVarint(data, pos)
+        lines, pos = readVarint(data, pos)
+        if pos != len(data):
+            raise ValueError("Повтор поврежден: лишние данные в конце")
+        return Replay(generator, seed, events, tick, score, lines, rules)
+
+    def save(self, path):
+        """Сохраняет повтор в файл."""
+        with open(path, 'wb') as file:
+            file.write(self.toBytes())
+
+    @staticmethod
+    def load(path):
+        """Загружает повтор из файла."""
+        with open(path, 'rb') as file:
+            return Replay.fromBytes(file.read())
+
+    def newEngine(self):
+        """Создает движок с генератором фигур и правилами, как в записанной партии."""
+        return Engine(generator=generators[self.generator](), rules=self.rules)
+
+    def play(self, engine):
+        """Проигрывает повтор на движке с максимальной скоростью."""
+        engine.start(self.seed)
+
+        for tick, action in self.events:
+            while engine.ticks < tick and engine.isStarted:
+                engine.step()
+            engine.apply(action)
+
+        while engine.ticks < self.ticks and engine.isStarted:
+            engine.step()
+
+        return engine
+
+    def matches(self, engine):
+        """Проверяет, что движок пришел к записанному итогу."""
+        return (engine.ticks, engine.current_score, engine.numLinesRemoved) == (self.ticks, self.score, self.lines)
+
+
+class Recorder:
+    """Записывает действия игрока на движке в повтор."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        name = next(name for name, cls in generators.items() if type(engine.generator) is cls)
+        self.replay = Replay(name, engine.generator.seed, rules=engine.rules)  # Записываемый повтор
+        engine.onAction = self.record
+
+    def record(self, action):
+        """Запоминает действие вместе с текущим тактом."""
+        self.replay.events.append((self.engine.ticks, action))
+
+    def finish(self):
+        """Завершает запись итогом партии, отключается от движка и возвращает повтор."""
+        self.replay.ticks = self.engine.ticks
+        self.replay.score = self.engine.current_score
+        self.replay.lines = self.engine.numLinesRemoved
+
+        if self.engine.onAction == self.record:
+            self.engine.onAction = None
+
+        return self.replay
+
+
+def main():
+    paths = sys.argv[1:]
+    if not paths:
+        print("Использование: python replay.py повтор.trp [повтор2.trp ...]")
+        sys.exit(2)
+
+    failed = 0
+    started = time.perf_counter()
+
+    for path in paths:
+        try:
+            replay = Replay.load(path)
+        except (OSError, ValueError) as error:
+            failed += 1
+            print(f"FAIL {path}: {error}")
+            continue
+
+        engine = replay.play(replay.newEngine())
+        ok = replay.matches(engine)
+        failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {path}: очки {engine.current_score} (записано {replay.score}), "
+              f"линии {engine.numLinesRemoved} (записано {replay.lines}), такты {engine.ticks}")
+
+    print(f"Повторов: {len(paths)}, расхождений: {failed}, время {time.perf_counter() - started:.2f} с")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
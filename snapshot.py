@@ -0,0 +1,197 @@
+"""Сохранение незаконченной партии в компактный снимок и восстановление из него.
+
+Снимок хранит доску (по две клетки в байте), текущую фигуру, счет и
+состояние генератора фигур. Генератор не сериализуется целиком: по
+имени, зерну и числу выданных фигур он воспроизводится заново, поэтому
+снимок доски 10x22 весит меньше 200 байт. Формат:
+
+    b'TTSS', версия (1 байт), длина имени генератора (1 байт), имя,
+    длина имени правил (1 байт), имя, зерно, выдано фигур, очки, линии,
+    фигуры, такты, время партии, флаги, форма, поворот, x, y, ширина,
+    высота, серия удалений, клетки доски.
+
+Запись на диск с fsync может занимать десятки миллисекунд, поэтому игра
+пишет снимки через Writer в фоновом потоке. У каждых правил и размера
+доски свой файл снимка (pathFor), так что запуск с другими правилами не
+трогает сохраненную партию.
+"""
+import os
+import queue
+import struct
+import threading
+
+from engine import Tetrominoe, rulesets
+from generator import generators
+
+Magic = b'TTSS'  # Сигнатура файла снимка
+Version = 3  # Версия формата
+Fields = struct.Struct('<QIIIIIfBBBhhHHB')  # Поля после имени правил
+
+Started = 1  # Флаг: партия идет
+WaitingAfterLine = 2  # Флаг: фигура зафиксирована, новая еще не появилась
+
+
+def toBytes(engine, elapsed=0.0):
+    """Кодирует состояние движка; elapsed - сколько секунд уже идет партия."""
+    generator = engine.generator
+    name = next(name for name, cls in generators.items() if type(generator) is cls).encode('ascii')
+    board = engine.board
+    flags = (Started if engine.isStarted else 0) | (WaitingAfterLine if engine.isWaitingAfterLine else 0)
+
+    out = bytearray(Magic)
+    rules = engine.rules.name.encode('ascii')
+    out += struct.pack('<BB', Version, len(name)) + name + bytes((len(rules),)) + rules
+    out += Fields.pack(generator.seed, generator.count, engine.current_score, engine.numLinesRemoved,
+                       engine.numPieces, engine.ticks, elapsed, flags, engine.curShape, engine.curRotation,
+                       engine.curX, engine.curY, board.width, board.height, engine.combo)
+
+    cells = [board.shapeAt(x, y) for y in range(board.height) for x in range(board.width)]
+    cells.append(Tetrominoe.NoShape)  # Выравнивание до четного числа клеток
+    out += bytes((cells[i] << 4) | cells[i + 1] for i in range(0, len(cells) - 1, 2))
+    return bytes(out)
+
+
+def fromBytes(data, engine):
+    """Восстанавливает состояние движка из снимка; возвращает время партии в секундах."""
+    if len(data) < 6 or data[:4] != Magic:
+        raise ValueError("Файл не является снимком партии")
+
+    version, length = struct.unpack_from('<BB', data, 4)
+    if version != Version:
+        raise ValueError(f"Неподдерживаемая версия снимка: {version}")
+
+    pos = 6 + length
+    name = data[6:pos].decode('ascii')
+    if len(data) <= pos:
+        raise ValueError("Снимок обрезан")
+    length = data[pos]
+    rules = data[pos + 1:pos + 1 + length].decode('ascii')
+    pos += 1 + length
+    if len(data) < pos + Fields.size:
+        raise ValueError("Снимок обрезан")
+    (seed, count, score, lines, pieces, ticks, elapsed, flags,
+     shape, rotation, curX, curY, width, height, combo) = Fields.unpack_from(data, pos)
+    pos += Fields.size
+
+    if len(data) != pos + (width * height + 1) // 2:  # Запись прервалась или в файле лишнее
+        raise ValueError("Снимок обрезан или поврежден")
+
+    board = engine.board
+    if (rules, width, height) != (engine.rules.name, board.width, board.height):
+        raise ValueError(f"Снимок для правил {rules} {width}x{height}, "
+                         f"а идет {engine.rules.name} {board.width}x{board.height}")
+
+    cells = [data[pos + i // 2] >> 4 if i % 2 == 0 else data[pos + i // 2] & 0x0F for i in range(width * height)]
+    if shape > Tetrominoe.MirroredLShape or rotation > 3 or max(cells) > Tetrominoe.Garbage:
+        raise ValueError("Снимок поврежден: неизвестная фигура или клетка")
+
+    engine.generator = generators[name]()
+    engine.generator.reset(seed)
+    for _ in range(count):  # Генератор продолжает ту же последовательность фигур
+        engine.generator.next()
+
+    board.clear()
+    for i, cell in enumerate(cells):
+        if cell != Tetrominoe.NoShape:
+            board.setShapeAt(i % width, i // width, cell)
+
+    if flags & Started and shape != Tetrominoe.NoShape and not board.fits(shape, rotation, curX, curY):
+        raise ValueError("Снимок поврежден: фигура не помещается на доску")
+
+    engine.current_score = score
+    engine.numLinesRemoved = lines
+    engine.numPieces = pieces
+    engine.ticks = ticks
+    engine.combo = combo
+    engine.isStarted = bool(flags & Started)
+    engine.isWaitingAfterLine = bool(flags & WaitingAfterLine)
+    engine.curShape = shape
+    engine.curRotation = rotation
+    engine.curX = curX
+    engine.curY = curY
+    engine.changed(stack=True)
+
+    return elapsed
+
+
+def pathFor(rules, path='tetris_save.bin'):
+    """Возвращает файл снимка для правил; для классических правил 10x22 - сам path."""
+    classic = rulesets['classic']
+    if (rules.name, rules.width, rules.height) == (classic.name, classic.width, classic.height):
+        return path
+
+    stem, extension = os.path.splitext(path)
+    return f"{stem}-{rules.name}-{rules.width}x{rules.height}{extension}"
+
+
+def write(data, path):
+    """Атомарно записывает снимок: при отключении питания остается старый или новый файл."""
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())  # Данные на диске до переименования
+    os.replace(temporary, path)
+
+
+def save(engine, path, elapsed=0.0):
+    """Записывает снимок движка в файл."""
+    write(toBytes(engine, elapsed), path)
+
+
+def load(path, engine):
+    """Восстанавливает движок из файла; возвращает время партии или None, если снимка нет."""
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+
+    return fromBytes(data, engine)
+
+
+def remove(path):
+    """Удаляет снимок, если он есть."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Writer:
+    """Записывает и удаляет снимки в фоновом потоке в порядке вызовов."""
+
+    def __init__(self):
+        self.queue = queue.Queue()  # Команды (команда, данные, путь) для потока записи
+        self.error = None  # Последняя ошибка записи (следующий снимок попробует снова)
+        self.thread = threading.Thread(target=self.loop, name='snapshot-writer', daemon=True)
+        self.thread.start()
+
+    def save(self, data, path):
+        """Ставит в очередь запись снимка data (готовые байты toBytes)."""
+        self.queue.put(('save', data, path))
+
+    def remove(self, path):
+        """Ставит в очередь удаление снимка."""
+        self.queue.put(('remove', None, path))
+
+    def close(self):
+        """Дописывает очередь и останавливает поток записи."""
+        self.queue.put(('close', None, None))
+        self.thread.join()
+
+    def loop(self):
+        """Выполняет команды из очереди (выполняется в потоке записи)."""
+        while True:
+            command, data, path = self.queue.get()
+            if command == 'close':
+                break
+
+            try:
+                if command == 'save':
+                    write(data, path)
+                else:
+                    remove(path)
+                self.error = None
+            except OSError as error:
+                self.error = error
@@ -0,0 +1,369 @@
+"""Регрессионные тесты.
+
+Запуск: python -m pytest -q
+"""
+import os
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+import snapshot
+from bot import Bot
+from database import Database
+from engine import Action, BitBoard, Engine, ListBoard, rulesets
+from env import TetrisEnv, VecTetrisEnv
+from gameloop import GameLoop
+from generator import generators
+from replay import Recorder, Replay
+
+Actions = (Action.MoveLeft, Action.MoveRight, Action.RotateLeft, Action.RotateRight, Action.DropDown,
+           Action.OneLineDown)
+
+
+def playRandom(engine, seed, ticks=3000):
+    """Играет случайными нажатиями до ticks тактов или конца партии."""
+    rng = random.Random(seed)
+    while engine.isStarted and engine.ticks < ticks:
+        if rng.random() < 0.5:
+            engine.apply(rng.choice(Actions))
+        engine.step()
+    return engine
+
+
+def state(engine):
+    """Возвращает итог партии и содержимое доски для сравнения."""
+    return (engine.current_score, engine.numLinesRemoved, engine.numPieces, engine.ticks, engine.isStarted,
+            engine.board.rowBits(), list(engine.board.heights))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_boards_random_play(seed):
+    """ListBoard и BitBoard дают одну и ту же партию при случайных нажатиях."""
+    games = []
+    for boardClass in (ListBoard, BitBoard):
+        engine = Engine(boardClass, generators['bag'](), rulesets['classic'])
+        engine.start(seed)
+        games.append(state(playRandom(engine, seed)))
+    assert games[0] == games[1]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_boards_bot_play(seed):
+    """ListBoard и BitBoard дают одну и ту же партию под управлением бота."""
+    games = []
+    for boardClass in (ListBoard, BitBoard):
+        engine = Engine(boardClass, generators['bag'](), rulesets['guideline'])
+        engine.start(seed)
+        bot = Bot()
+        while engine.isStarted and engine.numPieces < 200:
+            bot.play(engine)
+            engine.step()
+        games.append(state(engine))
+    assert games[0] == games[1]
+    assert games[0][1] > 0  # Бот удаляет линии, иначе сравнение мало что проверяет
+
+
+@pytest.mark.parametrize('rules', [rulesets['classic'], rulesets['guideline'].resized(12, 30)])
+def test_replay_roundtrip(rules):
+    """Повтор после toBytes -> fromBytes -> play приходит к записанным очкам."""
+    engine = Engine(generator=generators['bag'](), rules=rules)
+    engine.start(7)
+    recorder = Recorder(engine)  # После start(), иначе в повтор попадет зерно прошлой партии
+    playRandom(engine, 7)
+    replay = Replay.fromBytes(recorder.finish().toBytes())
+
+    assert (replay.rules.name, replay.rules.width, replay.rules.height) == (rules.name, rules.width, rules.height)
+    played = replay.play(replay.newEngine())
+    assert replay.matches(played)
+    assert played.current_score == engine.current_score
+
+
+def test_replay_truncated():
+    """Обрезанный или испорченный повтор отвергается с ValueError, а не IndexError."""
+    engine = Engine(generator=generators['bag'](), rules=rulesets['guideline'].resized(12, 30))
+    engine.start(7)
+    recorder = Recorder(engine)
+    playRandom(engine, 7, ticks=500)
+    data = recorder.finish().toBytes()
+
+    for length in range(len(data)):
+        with pytest.raises(ValueError):
+            Replay.fromBytes(data[:length])
+
+    with pytest.raises(ValueError):
+        Replay.fromBytes(data + b'\x00')  # Лишние данные в конце
+    with pytest.raises(ValueError):
+        Replay.fromBytes(data[:6] + b'xyz' + data[9:])  # Неизвестный генератор
+
+
+def test_snapshot_roundtrip():
+    """Снимок восстанавливает доску, фигуру и очередь фигур."""
+    engine = Engine(generator=generators['bag'](), rules=rulesets['guideline'])
+    engine.start(3)
+    playRandom(engine, 3, ticks=400)
+    data = snapshot.toBytes(engine, 12.5)
+
+    restored = Engine(generator=generators['bag'](), rules=rulesets['guideline'])
+    assert snapshot.fromBytes(data, restored) == 12.5
+    assert state(restored) == state(engine)
+    assert (restored.curShape, restored.curRotation, restored.curX, restored.curY) == \
+           (engine.curShape, engine.curRotation, engine.curX, engine.curY)
+    assert restored.preview(3) == engine.preview(3)
+
+
+def test_snapshot_truncated():
+    """Обрезанный или испорченный снимок отвергается с ValueError, а не роняет игру позже."""
+    engine = Engine(generator=generators['bag'](), rules=rulesets['classic'])
+    engine.start(1)
+    data = snapshot.toBytes(engine)
+
+    for length in range(len(data)):
+        with pytest.raises(ValueError):
+            snapshot.fromBytes(data[:length], Engine(generator=generators['bag']()))
+
+    fields = 6 + len('bag') + 1 + len('classic')  # Начало полей после имен генератора и правил
+    seed, count, *values = snapshot.Fields.unpack_from(data, fields)
+    corrupted = []
+    for index, value in ((6, 12), (7, 4), (8, -5), (9, 30)):  # Форма, поворот, x и y вне допустимых
+        changed = list(values)
+        changed[index] = value
+        corrupted.append(data[:fields] + snapshot.Fields.pack(seed, count, *changed) + data[fields + snapshot.Fields.size:])
+    corrupted.append(data[:-1] + bytes((0xF0,)))  # Клетка 15 на доске
+
+    for bad in corrupted:
+        with pytest.raises(ValueError):
+            snapshot.fromBytes(bad, Engine(generator=generators['bag']()))
+
+
+
+class LoopDriver:
+    """Игровой цикл на движке без Qt с искусственными часами и журналом действий."""
+
+    def __init__(self):
+        self.engine = Engine(generator=generators['bag'](), rules=rulesets['classic'])
+        self.engine.start(1)
+        self.actions = []  # (такт, действие) в порядке выполнения
+        self.engine.onAction = lambda action: self.actions.append((self.ticks, action))
+        self.loop = GameLoop(self.engine)
+        self.gravity = []  # Такты, на которых сработала гравитация
+        self.loop.onGravity = lambda: self.gravity.append(self.ticks)
+        self.ticks = 0  # Выполнено тактов
+        self.loop.start(0.0)
+
+    def run(self, ticks):
+        """Прокручивает цикл на ticks тактов, вызывая advance на середине каждого такта."""
+        for _ in range(ticks):
+            self.ticks += 1
+            assert self.loop.advance((self.ticks + 0.5) * self.loop.tickLength) == 1
+
+
+def test_loop_das_arr():
+    """Удерживаемое движение: сразу, затем через Das, затем каждые Arr."""
+    driver = LoopDriver()
+    loop = driver.loop
+    assert (loop.dasTicks, loop.arrTicks) == (10, 2)  # 0.167 и 0.033 с при 60 тактах в секунду
+
+    loop.press(Action.MoveRight)
+    driver.run(15)
+    assert driver.actions == [(0, Action.MoveRight), (10, Action.MoveRight), (12, Action.MoveRight),
+                              (14, Action.MoveRight)]
+
+    loop.release(Action.MoveRight)
+    driver.run(10)
+    assert len(driver.actions) == 4
+
+    loop.press(Action.RotateLeft)  # Поворот не повторяется
+    driver.run(20)
+    assert driver.actions[4:] == [(25, Action.RotateLeft)]
+
+
+def test_loop_opposite_directions():
+    """Нажатие противоположного направления отменяет автоповтор первого."""
+    driver = LoopDriver()
+    driver.loop.press(Action.MoveLeft)
+    driver.run(5)
+    driver.loop.press(Action.MoveRight)
+    driver.run(12)
+    assert driver.actions == [(0, Action.MoveLeft), (5, Action.MoveRight), (15, Action.MoveRight),
+                              (17, Action.MoveRight)]
+
+    driver.loop.release(Action.MoveRight)  # Левая клавиша все еще нажата, но не повторяется
+    driver.run(20)
+    assert len(driver.actions) == 4
+
+
+def test_loop_catch_up_cap():
+    """После долгой задержки цикл выполняет не больше MaxCatchUp тактов и не догоняет остаток."""
+    driver = LoopDriver()
+    loop = driver.loop
+    assert loop.advance(5.0) == GameLoop.MaxCatchUp
+    assert loop.advance(5.0 + 0.5 * loop.tickLength) == 0
+    assert loop.advance(5.0 + 1.5 * loop.tickLength) == 1
+
+    loop.stop()
+    assert loop.advance(10.0) == 0
+
+
+def test_loop_gravity_levels():
+    """Шаг гравитации берется из кривой правил по уровню и округляется до тактов."""
+    driver = LoopDriver()
+    driver.run(40)
+    assert driver.gravity == [18, 36]  # 0.3 с на первом уровне
+
+    engine = driver.engine
+    for level, ticks in ((0, 18), (1, 16), (7, 6), (16, 1), (100, 1)):
+        engine.numLinesRemoved = level * engine.rules.linesPerLevel
+        assert driver.loop.gravityTicks() == ticks
+
+    driver.loop.onGravity = None  # Без подписчика гравитация делает такт движка
+    engine.numLinesRemoved = 7 * engine.rules.linesPerLevel
+    started = engine.ticks
+    driver.run(12)
+    assert engine.ticks == started + 2
+
+
+def test_database_migrates_legacy_scores(tmp_path):
+    """Промежуточные очки старой таблицы scores сводятся к одной строке games на партию."""
+    path = str(tmp_path / 'scores.db')
+    with sqlite3.connect(path) as connection:
+        connection.execute('CREATE TABLE scores (id INTEGER PRIMARY KEY, score INTEGER NOT NULL)')
+        connection.executemany('INSERT INTO scores (score) VALUES (?)',
+                               [(100,), (200,), (400,), (100,), (100,), (300,)])  # Партии 400, 100 и 300
+    connection.close()
+
+    db = Database(path)
+    db.close()
+    with sqlite3.connect(path) as connection:
+        assert connection.execute('SELECT score, lines FROM games ORDER BY id').fetchall() == \
+               [(400, 4), (100, 1), (300, 3)]
+        assert connection.execute('PRAGMA user_version').fetchone()[0] == Database.SchemaVersion
+        assert connection.execute("SELECT name FROM sqlite_master WHERE name = 'scores'").fetchone() is None
+    connection.close()
+
+
+def test_database_top_scores(tmp_path):
+    """Таблица рекордов в памяти совпадает с базой и после новых партий."""
+    db = Database(str(tmp_path / 'scores.db'))
+    for score in (300, 100, 500):
+        db.insert_game(score, score // 100, 1.0, 'a')
+    assert [game[0] for game in db.top_scores(2)] == [500, 300]
+
+    db.insert_game(400, 4, 1.0, 'b')
+    db.insert_game(500, 5, 1.0, 'c')  # При равных очках выше партия, сыгранная раньше
+    assert [(game[0], game[4]) for game in db.top_scores(3)] == [(500, 'a'), (500, 'c'), (400, 'b')]
+    assert db.top_scores(3) == db.top_scores(Database.LeaderboardSize + 1)[:3]  # Чтение из базы
+    db.close()
+
+
+def test_database_percentile_rank(tmp_path):
+    """percentile_rank - доля партий с меньшим счетом; без партий - 0."""
+    db = Database(str(tmp_path / 'scores.db'))
+    assert db.percentile_rank(1000) == 0.0
+
+    for score in (100, 200, 300, 400):
+        db.insert_game(score, 0, 1.0)
+    db.close()
+
+    db = Database(str(tmp_path / 'scores.db'))  # Очки читаются из базы, а не из кэша
+    assert db.percentile_rank(300) == 50.0
+    assert db.percentile_rank(1000) == 100.0
+
+    db.insert_game(50, 0, 1.0)  # Кэш обновляется без повторного чтения
+    assert db.percentile_rank(300) == 60.0
+    db.close()
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """Приложение Qt без экрана, одно на все тесты."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    widgets = pytest.importorskip('PyQt6.QtWidgets')
+    return widgets.QApplication.instance() or widgets.QApplication([])
+
+
+@pytest.fixture
+def gui(qapp, tmp_path, monkeypatch):
+    """Модуль main; база и снимок окна игры создаются во временном каталоге."""
+    monkeypatch.chdir(tmp_path)
+
+    import main
+    return main
+
+
+def test_restart_removes_snapshot(gui, monkeypatch):
+    """Партия, записанная по R с отказом от перезапуска, не восстанавливается из снимка второй раз."""
+    monkeypatch.setattr(gui.QMessageBox, 'question', lambda *args: gui.QMessageBox.StandardButton.No)
+    tetris = gui.Tetris()
+    engine = tetris.tboard.engine
+    for _ in range(3):
+        engine.dropDown()
+        engine.step()
+    assert tetris.tboard.saveSnapshot()
+
+    tetris.tboard.restartGame()  # Отказ закрывает окно
+    assert not os.path.exists(gui.Tetris.SnapshotPath)
+    with sqlite3.connect('tetris_scores.db') as connection:
+        assert connection.execute('SELECT COUNT(*) FROM games').fetchone()[0] == 1
+
+    tetris = gui.Tetris()
+    assert not tetris.tboard.isPaused  # Новая партия, а не восстановленная
+    tetris.close()
+
+
+def test_snapshot_kept_for_other_rules(gui):
+    """Запуск с другим размером доски не выбрасывает сохраненную партию."""
+    rules = rulesets['guideline'].resized(12, 30)
+    tetris = gui.Tetris(rules=rules)
+    tetris.tboard.engine.dropDown()
+    tetris.close()  # Незаконченная партия сохраняется в снимок
+    path = snapshot.pathFor(rules, gui.Tetris.SnapshotPath)
+    assert os.path.exists(path)
+
+    tetris = gui.Tetris()  # Классические правила: новая партия
+    assert not tetris.tboard.isPaused
+    tetris.tboard.engine.dropDown()
+    tetris.close()
+    assert os.path.exists(path) and os.path.exists(gui.Tetris.SnapshotPath)
+
+    tetris = gui.Tetris(rules=rules)
+    assert tetris.tboard.isPaused and tetris.tboard.engine.numPieces == 1  # Партия восстановлена
+    tetris.close()
+
+
+@pytest.mark.parametrize('rules', [rulesets['classic'], rulesets['guideline'].resized(8, 16)])
+def test_envs_agree(rules):
+    """TetrisEnv и VecTetrisEnv совпадают шаг за шагом при одних зернах и действиях."""
+    count, seed = 3, 11
+    envs = [TetrisEnv(rules) for _ in range(count)]
+    vec = VecTetrisEnv(count, rules)
+    rng = np.random.default_rng(seed)
+
+    vecObservation, _ = vec.reset(seed)
+    observations = [env.reset(seed + i)[0] for i, env in enumerate(envs)]
+    nextSeed = seed + count  # Так VecTetrisEnv раздает зерна новым партиям
+    finished = 0
+
+    for _ in range(300):
+        for i, observation in enumerate(observations):
+            assert np.array_equal(vecObservation['board'][i], observation['board'])
+            assert vecObservation['piece'][i] == observation['piece']
+            assert vecObservation['next'][i] == observation['next']
+
+        actions = rng.integers(0, vec.placements.count, count)
+        vecObservation, vecRewards, vecTerminated, _, vecInfo = vec.step(actions)
+        for i, env in enumerate(envs):
+            observation, reward, terminated, _, info = env.step(int(actions[i]))
+            assert vecRewards[i] == reward
+            assert vecTerminated[i] == terminated
+            if terminated:
+                assert vecInfo['final_score'][i] == info['score']
+                observation, _ = env.reset(nextSeed)
+                nextSeed += 1
+                finished += 1
+            else:
+                assert vecInfo['score'][i] == info['score']
+            observations[i] = observation
+
+    assert finished > 0  # Проверен и перезапуск законченных партий
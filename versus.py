@@ -0,0 +1,211 @@
+"""Сетевой матч в окне игры: мост между asyncio и циклом событий Qt.
+
+Соединение с сервером обслуживает цикл asyncio в отдельном потоке, а
+принятые сообщения доставляются в поток интерфейса сигналом Qt
+(соединение между потоками ставит их в очередь событий), поэтому окно
+никогда не ждет сокет. Доски соперников воспроизводятся движками-тенями
+по их потоку шагов, действий и мусорных линий.
+"""
+import asyncio
+import random
+import threading
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QPainter
+from PyQt6.QtWidgets import QWidget
+
+import net
+from engine import Engine, Tetrominoe
+
+
+class Connection(QObject):
+    """Соединение с сервером в потоке asyncio; сообщения приходят сигналом received."""
+
+    received = pyqtSignal(int, int, object)  # Тип, игрок, поля
+    disconnected = pyqtSignal(str)  # Причина разрыва
+
+    def __init__(self, host, port, name, rules):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.name = name
+        self.rules = rules  # Правила игрока: сервер сверяет их у всех участников матча
+        self.loop = asyncio.new_event_loop()  # Цикл asyncio потока сети
+        self.writer = None  # Поток записи в сокет (живет в цикле сети)
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.run(),),
+                                       name='versus-network', daemon=True)
+        self.thread.start()
+
+    async def run(self):
+        """Подключается к серверу и пересылает входящие сообщения в поток интерфейса."""
+        try:
+            reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.writer.write(net.encode(net.Message.Hello, 0, self.name, self.rules.name,
+                                         self.rules.width, self.rules.height))
+
+            while True:
+                self.received.emit(*await net.readMessage(reader))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, ValueError) as error:
+            self.disconnected.emit(str(error) or "соединение закрыто")
+
+    def send(self, data):
+        """Отправляет данные из потока интерфейса, не дожидаясь сокета."""
+        if self.writer is not None:
+            self.loop.call_soon_threadsafe(self.writer.write, data)
+
+    def close(self):
+        """Закрывает соединение."""
+        if self.writer is not None:
+            self.loop.call_soon_threadsafe(self.writer.close)
+
+
+class Opponent:
+    """Соперник: имя и движок-тень, повторяющий его игру."""
+
+    def __init__(self, name, rules):
+        self.name = name  # Имя игрока
+        self.engine = Engine(rules=rules)  # Тень доски соперника (правила у всех игроков одни)
+        self.alive = True  # Соперник еще играет
+
+
+class OpponentsView(QWidget):
+    """Маленькие доски соперников в один ряд."""
+
+    CellSize = 8  # Размер клетки в пикселях
+    Spacing = 6  # Промежуток между досками
+
+    def __init__(self, versus, colorTable):
+        super().__init__()
+        self.versus = versus
+        self.colors = [QColor(color) for color in colorTable]  # Цвета форм
+        self.setMinimumHeight(versus.board.engine.board.height * OpponentsView.CellSize + 14)
+
+    def paintEvent(self, event):
+        """Рисует доски всех соперников."""
+        painter = QPainter(self)
+        cell = OpponentsView.CellSize
+        left = 0
+
+        for opponent in self.versus.opponents.values():
+            engine = opponent.engine
+            width = engine.board.width
+            height = engine.board.height
+            boardWidth = width * cell
+            painter.fillRect(left, 12, boardWidth, height * cell, QColor(0x202020))
+            painter.setPen(QColor(0x000000) if opponent.alive else QColor(0xCC6666))
+            painter.drawText(left, 10, opponent.name if opponent.alive else f"{opponent.name} ✗")
+
+            for y in range(height):
+                top = 12 + (height - y - 1) * cell
+                for x in range(width):
+                    shape = engine.shapeAt(x, y)
+                    if shape != Tetrominoe.NoShape:
+                        painter.fillRect(left + x * cell, top, cell - 1, cell - 1, self.colors[shape])
+
+            if engine.curShape != Tetrominoe.NoShape:
+                for x, y in engine.pieceCells():
+                    painter.fillRect(left + x * cell, 12 + (height - y - 1) * cell,
+                                     cell - 1, cell - 1, self.colors[engine.curShape])
+
+            left += boardWidth + OpponentsView.Spacing
+
+
+class Versus(QObject):
+    """Сетевой матч: отправляет ход своей доски и ведет тени соперников."""
+
+    def __init__(self, host, port, name, rules):
+        super().__init__()
+        self.rules = rules  # Правила матча, одни у всех игроков
+        self.board = None  # Доска игрока (main.Board)
+        self.playerId = None  # Номер игрока в матче
+        self.opponents = {}  # Соперники по номеру
+        self.rng = random.Random()  # Выбор дыры в полученных мусорных линиях
+        self.view = None  # Виджет досок соперников
+        self.rejected = False  # Сервер отклонил подключение
+
+        self.connection = Connection(host, port, name, rules)
+        self.connection.received.connect(self.received, Qt.ConnectionType.QueuedConnection)
+        self.connection.disconnected.connect(self.disconnected, Qt.ConnectionType.QueuedConnection)
+
+    def attach(self, board):
+        """Подключает доску игрока и создает виджет досок соперников."""
+        self.board = board
+        self.view = OpponentsView(self, board.colorTable)
+        return self.view
+
+    def hook(self, engine):
+        """Подписывается на шаги и действия движка игрока, сохраняя прежнего подписчика действий."""
+        previous = engine.onAction
+
+        def onAction(action):
+            if previous is not None:
+                previous(action)
+            self.send(net.Message.Action, action)
+
+        engine.onAction = onAction
+        engine.onStep = lambda: self.send(net.Message.Step)
+
+    def send(self, kind, *fields):
+        """Отправляет сообщение от имени игрока."""
+        if self.playerId is not None:
+            self.connection.send(net.encode(kind, self.playerId, *fields))
+
+    def received(self, kind, player, fields):
+        """Обрабатывает сообщение сервера (в потоке интерфейса)."""
+        if kind == net.Message.Join:
+            self.opponents[player] = Opponent(fields[0], self.rules)
+            self.board.msg2Statusbar.emit(f"Ожидание игроков: подключился {fields[0]}")
+
+        elif kind == net.Message.Start:
+            self.playerId = player
+            players, seed = fields
+            for opponent in self.opponents.values():
+                opponent.engine.start(seed)
+            self.board.start(seed)
+
+        elif kind == net.Message.Attack:  # Соперник отправил нам мусорные линии
+            hole = self.rng.randrange(self.board.engine.board.width)
+            self.board.engine.addGarbage(fields[0], hole)
+            self.send(net.Message.Garbage, fields[0], hole)
+
+        elif kind == net.Message.Reject:
+            self.rejected = True
+            self.board.matchOver(f"Сервер отклонил подключение: {fields[0]}")
+
+        elif kind == net.Message.Winner:
+            opponent = self.opponents.get(player)
+            winner = "вы" if player == self.playerId else opponent.name if opponent is not None else "никто"
+            self.board.matchOver(f"Матч окончен, победитель: {winner}")
+
+        elif player in self.opponents:
+            opponent = self.opponents[player]
+            if kind == net.Message.Step:
+                opponent.engine.step()
+            elif kind == net.Message.Action:
+                opponent.engine.apply(fields[0])
+            elif kind == net.Message.Garbage:
+                opponent.engine.addGarbage(*fields)
+            elif kind == net.Message.GameOver:
+                opponent.alive = False
+
+        if self.view is not None:
+            self.view.update()
+
+    def disconnected(self, reason):
+        """Сообщает о разрыве соединения."""
+        if not self.rejected:  # После отказа сервер закрывает соединение: причина уже показана
+            self.board.matchOver(f"Нет связи с сервером: {reason}")
+
+    def linesCleared(self, numFullLines):
+        """Атакует соперников за удаленные линии."""
+        lines = net.GarbageTable[min(numFullLines, len(net.GarbageTable) - 1)]
+        if lines:
+            self.send(net.Message.Attack, lines)
+
+    def gameOver(self):
+        """Сообщает серверу, что игрок выбыл."""
+        self.send(net.Message.GameOver)
+
+    def close(self):
+        """Закрывает соединение."""
+        self.connection.close()